@@ -1,7 +1,6 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from PIL import Image
 import plotly.express as px
 import plotly.graph_objects as go
 import matplotlib.pyplot as plt
@@ -12,10 +11,10 @@ from datetime import datetime, date
 # Import our custom modules
 import data_manager
 import chatbot
-
-# Get the absolute path to the project directory
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-LOGO_DIR = os.path.join(BASE_DIR, "logo")
+import card_renderer
+import logo_cache
+import llm_cache
+import metrics
 
 # Set page configuration
 st.set_page_config(
@@ -116,6 +115,9 @@ def initialize_session_state():
     if 'show_comparison' not in st.session_state:
         st.session_state.show_comparison = False
 
+# Number of plan cards rendered per page on the Insurance Plans screen
+PLANS_PAGE_SIZE = 12
+
 # Function to navigate between screens
 def navigate_to(screen):
     st.session_state.current_screen = screen
@@ -166,6 +168,37 @@ def display_sidebar():
             
         st.markdown('</div>', unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
+        
+        # Performance panel, shown with ?debug=1 or INSUREBOT_DEBUG=1
+        if st.query_params.get("debug") == "1" or os.environ.get("INSUREBOT_DEBUG") == "1":
+            display_debug_panel()
+
+# Function to display latency and cache statistics in the sidebar
+def display_debug_panel():
+    with st.expander("Performance", expanded=False):
+        snapshot = metrics.get_metrics_snapshot()
+        if snapshot["operations"]:
+            rows = [
+                {"operation": name, "count": op["count"], "errors": op["errors"], "mean ms": op["mean_ms"],
+                 "p50 ms": op["p50_ms"], "p95 ms": op["p95_ms"], "max ms": op["max_ms"]}
+                for name, op in snapshot["operations"].items()
+            ]
+            st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        else:
+            st.caption("No operations recorded yet.")
+        
+        st.caption("Counters")
+        st.json({
+            "events": snapshot["counters"],
+            "catalog_cache": data_manager.get_catalog_cache_stats(),
+            "card_fragments": card_renderer.get_fragment_cache_stats(),
+            "logos": logo_cache.get_logo_cache_stats(),
+            "llm_responses": llm_cache.get_llm_cache_stats()
+        }, expanded=False)
+        
+        if st.button("Reset metrics", key="reset_metrics", use_container_width=True):
+            metrics.reset_metrics()
+            st.rerun()
 
 # Welcome screen
 def welcome_screen():
@@ -365,12 +398,14 @@ def chat_screen():
                         st.write(message["content"])
                         
                         if hasattr(st.session_state, 'current_recommendations'):
+                            value_picks = data_manager.get_value_pick_ids()
                             for i, plan in enumerate(st.session_state.current_recommendations, 1):
                                 col1, col2 = st.columns([5, 1])
                                 with col1:
                                     # Get score from whole_life_score in details if available
                                     score = plan.get("details", {}).get("whole_life_score", "N/A")
-                                    st.write(f'{i}. {plan["title"]} by {plan["company"]} | Price: HKD {plan["price"]}/month Score: {score}')
+                                    value_label = " | 💰 Best value" if plan["id"] in value_picks else ""
+                                    st.write(f'{i}. {plan["title"]} by {plan["company"]} | Price: HKD {plan["price"]}/month Score: {score}{value_label}')
                                 with col2:
                                     # Add message_idx to make the key unique for each message/plan combination
                                     unique_key = f"save_plan_{message_idx}_{plan['id']}_{i}"
@@ -395,10 +430,12 @@ def chat_screen():
             try:
                 # Check if the response is a dictionary with has_search_criteria flag
                 has_search_criteria = False
+                search_criteria = {}
                 bot_response = ""
                 
                 if isinstance(response, dict) and "has_search_criteria" in response:
                     has_search_criteria = response["has_search_criteria"]
+                    search_criteria = response.get("insurance_criteria", {})
                     bot_response = response["response"]
                 elif isinstance(response, str):
                     clean_response = response.strip('`').strip('json').strip()
@@ -408,6 +445,7 @@ def chat_screen():
                         # Check if insurance_criteria exists and is not empty
                         if "insurance_criteria" in response_data and response_data["insurance_criteria"]:
                             has_search_criteria = True
+                            search_criteria = response_data["insurance_criteria"]
                         if not bot_response:
                             bot_response = clean_response
                     except json.JSONDecodeError:
@@ -422,13 +460,19 @@ def chat_screen():
                 if has_search_criteria:
                     # Show spinner while fetching insurance plans
                     with st.spinner("Finding insurance plans for you..."):
-                        insurance_plans = data_manager.get_whole_life_insurance()
-                        if insurance_plans:
-                            sorted_plans = sorted(insurance_plans, key=lambda x: x.get("score", 0), reverse=True)
-                            top_3_plans = sorted_plans[:3]
+                        # Fall back to the profile's gender and smoker status when not mentioned
+                        criteria = dict(search_criteria)
+                        for key in ("gender", "smoker_status"):
+                            if key not in criteria and st.session_state.chatbot_context.get(key):
+                                criteria[key] = st.session_state.chatbot_context[key]
+                        
+                        top_3_plans = data_manager.recommend_plans(criteria, k=3)
+                        if top_3_plans:
                             st.session_state.current_recommendations = top_3_plans
                             plans_message = "Here are the top 3 insurance plans for you:"
                             st.session_state.chat_history.append({"role": "bot", "content": plans_message, "type": "plans"})
+                        else:
+                            st.session_state.chat_history.append({"role": "bot", "content": "I couldn't find any plans matching those criteria. Try widening your budget or lowering the minimum score."})
             
             except Exception as e:
                 print(f"Error: {str(e)}")
@@ -474,64 +518,12 @@ def comparison_screen():
                 </div>
                 """, unsafe_allow_html=True)
                 
-                # Map company names to logo filenames
-                company_logo_map = {
-                    "AIA": "Brokerage_AIA_e76423525d.png",
-                    "AXA": "AXA_logo_21b519b8f2.png",
-                    "BOC Life": "BOCL_logo_c3917e8087.png",
-                    "Chubb": "Chubb_logo_bbd61d9801.png",
-                    "China Life": "China_Life_logo_6849c94581.png",
-                    "FT Life": "FT_Life_logo_954f536d7e.jpg",
-                    "FWD": "FWD_logo_694230ea93.jpg",
-                    "Generali": "Generali_logo_78dd1d3d8b.png",
-                    "Manulife": "Manulife_logo_1449597a78.png",
-                    "Prudential": "Prudential_logo_f4e56bc4f0.png",
-                    "Sun Life": "Insurer_Sun_Life_logo_new2023_b0ccadbe5f.png",
-                    "Well Link": "Well_Link_logo_2_resized_96d44077d2.png",
-                    "YF Life": "YF_Life_logo_065ba084ce.png"
-                }
-                
                 # Company name display
                 company_name = plan['company']
                 st.markdown(f"<h3 style='text-align: center; color: #00bfa5;'>{company_name}</h3>", unsafe_allow_html=True)
                 
-                # Get the correct logo for the company - handle Chinese characters
-                logo_filename = ""
-                # First try direct lookup
-                if company_name in company_logo_map:
-                    logo_filename = company_logo_map[company_name]
-                else:
-                    # Try matching on the English part before any pipe symbol
-                    if "|" in company_name:
-                        english_name = company_name.split("|")[0].strip()
-                        if english_name in company_logo_map:
-                            logo_filename = company_logo_map[english_name]
-                        else:
-                            # Try partial matching - find if any key is contained in the company name
-                            for key in company_logo_map:
-                                if key in company_name:
-                                    logo_filename = company_logo_map[key]
-                                    break
-                
-                print(f"Company name: {company_name}, English part: {company_name.split('|')[0].strip() if '|' in company_name else company_name}, Logo filename: {logo_filename}")
-                
-                # Initialize company_logo variable
-                company_logo = None
-                
-                if logo_filename:
-                    # Display company logo using Streamlit's image display functionality
-                    try:
-                        # Use absolute path to logo directory
-                        logo_path = os.path.join(LOGO_DIR, logo_filename)
-                        print(f"Looking for logo at: {logo_path}")
-                        print(f"File exists: {os.path.exists(logo_path)}")
-                        
-                        if os.path.exists(logo_path):
-                            company_logo = Image.open(logo_path)
-                    except Exception as e:
-                        # Show the error for debugging
-                        print(f"Error loading logo: {str(e)}")
-                        pass
+                # Pre-resized logo from the shared cache, or None if the insurer has no logo
+                company_logo = logo_cache.get_logo_thumbnail(company_name)
                 
                 # Plan name
                 st.markdown(f"<h4 style='text-align: center;'>{plan['title']}</h4>", unsafe_allow_html=True)
@@ -544,9 +536,8 @@ def comparison_screen():
                 with col2:
                     #show company logo or 10Life rating if logo not available
                     if company_logo is not None:
-                        st.image(company_logo, width=150)
+                        st.image(company_logo, width=logo_cache.LOGO_DISPLAY_WIDTH)
                     else:
-                        print(f"company_logo: {company_logo}")
                         st.markdown(f"""
                         <div style="width: 60px; height: 60px; background-color: #00bfa5; border-radius: 50%; 
                             margin: 0 auto; display: flex; flex-direction: column; justify-content: center; 
@@ -588,47 +579,20 @@ def comparison_screen():
     st.markdown('<h3 style="color: #1E88E5; border-bottom: 1px solid #e0e0e0; padding-bottom: 10px;">Scores</h3>', unsafe_allow_html=True)
     cols = st.columns(len(plans) + 1)  # Always create enough columns for plans + labels
     
-    # Labels column
-    cols[0].markdown("<div style='font-weight: bold; margin-bottom: 15px;'>Total Score</div>", unsafe_allow_html=True)
-    cols[0].markdown("<div style='font-weight: bold; margin-bottom: 15px;'>Whole Life CI Coverage Score</div>", unsafe_allow_html=True)
-    cols[0].markdown("<div style='font-weight: bold; margin-bottom: 15px;'>Terms Score</div>", unsafe_allow_html=True)
-    
-    # Values columns
+    # Labels column, then one cached fragment per plan column
+    catalog_version = data_manager.get_catalog_version()
+    cols[0].markdown(card_renderer.comparison_labels_html("scores"), unsafe_allow_html=True)
     for i, plan in enumerate(plans):
-        total_score = float(plan["details"].get("total_score", 0))
-        whole_life_score = float(plan["details"].get("whole_life_score", 0))
-        terms_score = float(plan["details"].get("terms_score", 0))
-        
-        formatted_total = f"{total_score:.1f}"
-        formatted_whole_life = f"{whole_life_score:.1f}" if whole_life_score > 0 else "N/A"
-        formatted_terms = f"{terms_score:.1f}" if terms_score > 0 else "N/A"
-        
-        cols[i+1].markdown(f"<div style='margin-bottom: 15px; font-weight: bold; color: #00bfa5;'>{formatted_total} <span style='font-weight: normal; color: #666;'>/10</span></div>", unsafe_allow_html=True)
-        cols[i+1].markdown(f"<div style='margin-bottom: 15px; font-weight: bold;'>{formatted_whole_life} <span style='font-weight: normal; color: #666;'>/10</span></div>", unsafe_allow_html=True)
-        cols[i+1].markdown(f"<div style='margin-bottom: 15px; font-weight: bold;'>{formatted_terms} <span style='font-weight: normal; color: #666;'>/10</span></div>", unsafe_allow_html=True)
+        cols[i+1].markdown(card_renderer.comparison_column_html(plan, catalog_version, "scores"), unsafe_allow_html=True)
     
     # Coverage section
     st.markdown('<h3 style="color: #1E88E5; border-bottom: 1px solid #e0e0e0; padding-bottom: 10px; margin-top: 20px;">Coverage Details</h3>', unsafe_allow_html=True)
     cols = st.columns(len(plans) + 1)
     
-    # Coverage labels
-    cols[0].markdown("<div style='font-weight: bold; margin-bottom: 15px;'>Annual Premium</div>", unsafe_allow_html=True)
-    cols[0].markdown("<div style='font-weight: bold; margin-bottom: 15px;'>Premium Term (Years)</div>", unsafe_allow_html=True)
-    cols[0].markdown("<div style='font-weight: bold; margin-bottom: 15px;'>Major Illnesses Covered</div>", unsafe_allow_html=True)
-    cols[0].markdown("<div style='font-weight: bold; margin-bottom: 15px;'>Early Illnesses Covered</div>", unsafe_allow_html=True)
-    cols[0].markdown("<div style='font-weight: bold; margin-bottom: 15px;'>Maximum Payout</div>", unsafe_allow_html=True)
-    cols[0].markdown("<div style='font-weight: bold; margin-bottom: 15px;'>Waiting Period</div>", unsafe_allow_html=True)
-    cols[0].markdown("<div style='font-weight: bold; margin-bottom: 15px;'>Issue Age</div>", unsafe_allow_html=True)
-    
-    # Coverage values
+    # Coverage labels and values
+    cols[0].markdown(card_renderer.comparison_labels_html("coverage"), unsafe_allow_html=True)
     for i, plan in enumerate(plans):
-        cols[i+1].markdown(f"<div style='margin-bottom: 15px; font-weight: bold;'>USD {float(plan['price']) * 12:.0f} <span style='font-weight: normal; color: #666;'>/ Year</span></div>", unsafe_allow_html=True)
-        cols[i+1].markdown(f"<div style='margin-bottom: 15px;'>{plan['details'].get('premium_term_years', 'N/A')}</div>", unsafe_allow_html=True)
-        cols[i+1].markdown(f"<div style='margin-bottom: 15px;'>{plan['details'].get('major_illnesses', 'N/A')}</div>", unsafe_allow_html=True)
-        cols[i+1].markdown(f"<div style='margin-bottom: 15px;'>{plan['details'].get('early_illnesses', 'N/A')}</div>", unsafe_allow_html=True)
-        cols[i+1].markdown(f"<div style='margin-bottom: 15px;'>{plan['details'].get('maximum_payout', 'N/A')}</div>", unsafe_allow_html=True)
-        cols[i+1].markdown(f"<div style='margin-bottom: 15px;'>{plan['details'].get('waiting_period', 'N/A')}</div>", unsafe_allow_html=True)
-        cols[i+1].markdown(f"<div style='margin-bottom: 15px;'>{plan['details'].get('issue_age', 'N/A')}</div>", unsafe_allow_html=True)
+        cols[i+1].markdown(card_renderer.comparison_column_html(plan, catalog_version, "coverage"), unsafe_allow_html=True)
     
     st.markdown("</div>", unsafe_allow_html=True)  # Close card div
     
@@ -641,8 +605,7 @@ def comparison_screen():
     if len(plans) == 2:
         with col2:
             if st.button("Save Plans", key="save_comparison", use_container_width=True):
-                for plan in plans:
-                    data_manager.save_plan(plan['id'])
+                data_manager.save_plans([plan['id'] for plan in plans])
                 st.success("Both plans saved to your saved plans!")
 
 # Saved plans screen
@@ -765,6 +728,7 @@ def saved_plans_screen():
         else:
             # LIST VIEW
             # Display saved plans grid
+            catalog_version = data_manager.get_catalog_version()
             col1, col2 = st.columns(2)
             
             for i, plan in enumerate(saved_plans):
@@ -772,45 +736,7 @@ def saved_plans_screen():
                 with col:
                     # Create a card container with border
                     with st.container():
-                        st.markdown(f"""
-                        <div style="border-radius: 12px; padding: 20px; margin-bottom: 20px; position: relative; background-color: white; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                            <div style="position: absolute; top: 10px; right: 10px; background-color: #1E88E5; color: white; padding: 5px 10px; border-radius: 4px; font-size: 12px; font-weight: bold;">
-                                Saved
-                            </div>
-                        """, unsafe_allow_html=True)
-                            
-                            # Company and plan name - outside the markdown
-                        st.markdown(f"""
-                            <div style="text-align: center; margin: 10px auto; padding: 10px; font-weight: bold; color: #333; font-size: 18px;">
-                                {plan["company"]}
-                            </div>
-                            <div style="text-align: center; font-size: 20px; font-weight: bold; margin: 15px 0; color: #333;">
-                                {plan["title"]}
-                            </div>
-                            <p style="text-align: center; color: #666; font-size: 14px;">
-                                Saved on: {plan.get("date_saved", "Unknown date")}
-                            </p>
-                        """, unsafe_allow_html=True)
-                        
-                        # Features section
-                        if "features" in plan and plan["features"]:
-                            features_html = ""
-                            for feature in plan["features"][:2]:
-                                features_html += f'<li><span style="color: #4CAF50;">✓</span> {feature}</li>'
-                            
-                            st.markdown(f"""
-                            <ul style="list-style-type: none; padding-left: 20px; margin-bottom: 15px;">
-                                {features_html}
-                            </ul>
-                            """, unsafe_allow_html=True)
-                        
-                        # Price
-                        st.markdown(f"""
-                            <div style="display: flex; justify-content: space-between; align-items: center; margin-top: 15px; padding-top: 15px; border-top: 1px solid #eee;">
-                                <span style="font-size: 1.3rem; font-weight: bold; color: #333;">${plan["price"]}/month</span>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
+                        st.markdown(card_renderer.saved_plan_card_html(plan, catalog_version), unsafe_allow_html=True)
                         
                         # Add buttons to interact with the saved plan
                         col_a, col_b = st.columns(2)
@@ -959,60 +885,61 @@ def insurance_plans_screen():
     
     st.markdown("</div>", unsafe_allow_html=True)
     
-    # Helper function to parse score values
-    def parse_score(score_value):
-        try:
-            if isinstance(score_value, (int, float)):
-                return float(score_value)
-            
-            # Convert to string and handle None/empty cases
-            score_str = str(score_value or "0")
-            
-            # Replace "N/A" with "0"
-            score_str = score_str.replace("N/A", "0")
-            
-            # If score contains " / 10", extract the number part
-            if "/" in score_str:
-                score_str = score_str.split("/")[0].strip()
-            
-            return float(score_str)
-        except (ValueError, TypeError):
-            return 0.0
-    
-    # Get filtered plans
-    filtered_plans = data_manager.filter_whole_life_insurance(
-        gender=st.session_state.insurance_filters["gender"],
-        age=st.session_state.insurance_filters["age"],
-        smoker_status=st.session_state.insurance_filters["smoker_status"],
-        max_price=st.session_state.insurance_filters["max_price"],
-        min_score=st.session_state.insurance_filters["min_score"]
+    # Budget and score sliders; counts come from the segment's cumulative histograms
+    filters = st.session_state.insurance_filters
+    histograms = data_manager.get_segment_histograms(filters["gender"], filters["age"], filters["smoker_status"])
+    if histograms is not None and len(histograms["price_thresholds"]) > 0:
+        # Prices are the feed's USD annual premium / 12; round the top of the budget slider up to the next USD 10 step
+        price_limit = max(10, int(np.ceil(histograms["max_price"] / 10)) * 10)
+        slider_col1, slider_col2 = st.columns(2)
+        with slider_col1:
+            filters["max_price"] = st.slider(
+                "Max monthly premium (USD)",
+                min_value=10,
+                max_value=price_limit,
+                value=max(10, min(int(filters["max_price"]), price_limit)),
+                step=10,
+                key="filter_max_price"
+            )
+            under_price = data_manager.count_segment_plans(filters["gender"], filters["age"],
+                                                           filters["smoker_status"], max_price=filters["max_price"])
+            st.caption(f"{under_price} plans at or under USD {filters['max_price']}/month")
+        with slider_col2:
+            filters["min_score"] = st.slider(
+                "Minimum total score",
+                min_value=0.0,
+                max_value=10.0,
+                value=float(filters["min_score"]),
+                step=0.5,
+                key="filter_min_score"
+            )
+            above_score = data_manager.count_segment_plans(filters["gender"], filters["age"],
+                                                           filters["smoker_status"], min_score=filters["min_score"])
+            st.caption(f"{above_score} plans scoring {filters['min_score']:.1f} or higher")
+    
+    # Start again from the first page whenever the filters change
+    filter_key = tuple(sorted(filters.items()))
+    if st.session_state.get("plans_filter_key") != filter_key:
+        st.session_state.plans_filter_key = filter_key
+        st.session_state.plans_visible = PLANS_PAGE_SIZE
+    
+    # Count all matches, but only fetch the pages shown so far
+    total_plans = data_manager.count_segment_plans(
+        filters["gender"], filters["age"], filters["smoker_status"],
+        max_price=filters["max_price"], min_score=filters["min_score"]
+    )
+    filtered_plans = data_manager.get_segment_plans(
+        gender=filters["gender"],
+        age=filters["age"],
+        smoker_status=filters["smoker_status"],
+        max_price=filters["max_price"],
+        min_score=filters["min_score"],
+        offset=0,
+        limit=st.session_state.plans_visible
     )
-    
-    # Remove duplicate plans (same name and company)
-    seen_plans = {}
-    unique_plans = []
-    for plan in filtered_plans:
-        plan_key = (plan['company'], plan['title'])
-        if plan_key not in seen_plans:
-            seen_plans[plan_key] = plan
-            unique_plans.append(plan)
-        else:
-            # If we find a duplicate, keep the one with the higher score
-            existing_plan = seen_plans[plan_key]
-            new_plan_score = float(plan["details"].get("total_score", 0))
-            existing_plan_score = float(existing_plan["details"].get("total_score", 0))
-            if new_plan_score > existing_plan_score:
-                seen_plans[plan_key] = plan
-                unique_plans[unique_plans.index(existing_plan)] = plan
-    
-    # Replace filtered_plans with unique_plans
-    filtered_plans = unique_plans
-    
-    # Sort plans by score (highest first)
-    filtered_plans.sort(key=lambda x: parse_score(x["details"].get("whole_life_score", "0")), reverse=True)
     
     # Display number of found plans
-    st.markdown(f"<p style='text-align: center; margin-bottom: 20px; font-size: 1.2rem;'><strong>Found {len(filtered_plans)} matching plans</strong></p>", unsafe_allow_html=True)
+    st.markdown(f"<p style='text-align: center; margin-bottom: 20px; font-size: 1.2rem;'><strong>Found {total_plans} matching plans</strong></p>", unsafe_allow_html=True)
     
     # Show comparison banner if plans are selected
     if st.session_state.comparison_plans:
@@ -1026,6 +953,10 @@ def insurance_plans_screen():
     if not filtered_plans:
         st.warning("No plans match your criteria. Consider adjusting your filters.")
     else:
+        # Plans no cheaper, better-scoring plan in their segment beats
+        value_picks = data_manager.get_value_pick_ids()
+        catalog_version = data_manager.get_catalog_version()
+        
         # Create a 3-column layout for the cards
         col1, col2, col3 = st.columns(3)
         columns = [col1, col2, col3]
@@ -1033,72 +964,11 @@ def insurance_plans_screen():
         for i, plan in enumerate(filtered_plans):
             col = columns[i % 3]
             with col:
-                # Get scores from the plan details
-                whole_life_score = float(plan["details"].get("whole_life_score", 0))
-                terms_score = float(plan["details"].get("terms_score", 0))
-                total_score = float(plan["details"].get("total_score", 0))
-                
-                # Format the scores before using in f-string
-                formatted_whole_life = f"{whole_life_score:.1f}" if whole_life_score > 0 else "N/A"
-                formatted_terms = f"{terms_score:.1f}" if terms_score > 0 else "N/A"
-                formatted_total = f"{total_score:.1f}"
-                
-                # Use Streamlit components instead of raw HTML
-                with st.container():
-                    # Apply CSS class from style.css
-                    st.markdown('<div class="insurance-card">', unsafe_allow_html=True)
-                    
-                    # Rating circle using plain HTML (this is simpler and more reliable)
-                    star_rating = '★★★★★' if total_score >= 9 else '★★★★☆' if total_score >= 7 else '★★★☆☆' if total_score >= 5 else '★★☆☆☆' if total_score >= 3 else '★☆☆☆☆'
-                    st.markdown(f"""
-                    <div class="card-rating">
-                        <span>Star Rating</span>
-                        <span>{star_rating}</span>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Company and plan name
-                    st.markdown(f'<div class="company-logo">{plan["company"]}</div>', unsafe_allow_html=True)
-                    st.markdown(f'<div class="plan-name">{plan["title"]}</div>', unsafe_allow_html=True)
-                    
-                    # Scores
-                    st.markdown("<div style='margin: 20px 0;'>", unsafe_allow_html=True)
-                    
-                    # Total Score
-                    st.markdown(f"""
-                    <div class="detail-row">
-                        <div class="detail-label">Total Score</div>
-                        <div class="detail-value">{formatted_total} <span style="font-weight: normal; color: #666;">/10</span></div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Whole Life Score
-                    st.markdown(f"""
-                    <div class="detail-row">
-                        <div class="detail-label">Whole Life CI Coverage Score</div>
-                        <div class="detail-value">{formatted_whole_life} <span style="font-weight: normal; color: #666;">/10</span></div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Terms Score
-                    st.markdown(f"""
-                    <div class="detail-row">
-                        <div class="detail-label">Terms Score</div>
-                        <div class="detail-value">{formatted_terms} <span style="font-weight: normal; color: #666;">/10</span></div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.markdown("</div>", unsafe_allow_html=True)
-                    
-                    # Annual Premium
-                    st.markdown(f"""
-                    <div class="premium-row">
-                        <div class="premium-label">Annual Premium</div>
-                        <div class="premium-value">USD {plan['price'] * 12:.0f} <span style="font-weight: normal; font-size: 14px;">/ Year</span></div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.markdown('</div>', unsafe_allow_html=True)  # Close insurance-card div
+                # Whole card as one cached HTML fragment
+                st.markdown(
+                    card_renderer.plan_card_html(plan, catalog_version, value_pick=plan["id"] in value_picks),
+                    unsafe_allow_html=True
+                )
                 
                 # Add actual Streamlit buttons for functionality
                 cols = st.columns(2)
@@ -1121,6 +991,13 @@ def insurance_plans_screen():
                         # Save the plan using data_manager function
                         data_manager.save_plan(plan['id'])
                         st.toast(f"Saved {plan['title']} to your plans", icon="💾")
+        
+        # Load the next page on demand
+        if len(filtered_plans) < total_plans:
+            st.caption(f"Showing {len(filtered_plans)} of {total_plans} plans")
+            if st.button("Load more plans", key="load_more_plans", use_container_width=True):
+                st.session_state.plans_visible += PLANS_PAGE_SIZE
+                st.rerun()
     
     col1, col2 = st.columns(2)
     with col1:
@@ -1130,11 +1007,22 @@ def insurance_plans_screen():
         if st.button("View Saved Plans", key="insurance_to_saved"):
             navigate_to("saved")
 
+# Warm the shared logo cache once per server process
+@st.cache_resource
+def warm_logo_cache():
+    return logo_cache.warm_logo_cache(data_manager.get_companies())
+
 # Main function
 def main():
     # Initialize session state
     initialize_session_state()
     
+    # Decode and resize insurer logos before the first comparison render
+    warm_logo_cache()
+    
+    # Write the metrics file periodically when INSUREBOT_METRICS_FILE is set
+    metrics.start_metrics_exporter()
+    
     # Load custom CSS
     load_css()
     
@@ -1144,19 +1032,19 @@ def main():
     # Display navigation sidebar
     display_sidebar()
     
-    # Display the appropriate screen based on session state
-    if st.session_state.current_screen == "welcome":
-        welcome_screen()
-    elif st.session_state.current_screen == "profile_setup":
-        profile_setup_screen()
-    elif st.session_state.current_screen == "chat":
-        chat_screen()
-    elif st.session_state.current_screen == "insurance_plans":
-        insurance_plans_screen()
-    elif st.session_state.current_screen == "comparison":
-        comparison_screen()
-    elif st.session_state.current_screen == "saved":
-        saved_plans_screen()
+    # Display the appropriate screen based on session state, timing each render
+    screens = {
+        "welcome": welcome_screen,
+        "profile_setup": profile_setup_screen,
+        "chat": chat_screen,
+        "insurance_plans": insurance_plans_screen,
+        "comparison": comparison_screen,
+        "saved": saved_plans_screen
+    }
+    screen = screens.get(st.session_state.current_screen)
+    if screen is not None:
+        with metrics.timer(f"screen.{st.session_state.current_screen}"):
+            screen()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
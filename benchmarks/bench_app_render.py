@@ -0,0 +1,261 @@
+"""End-to-end render benchmark and concurrent-session load test for app.py.
+
+Drives app.main through Streamlit's AppTest with the LLM call stubbed out, so
+no network access or GITHUB_TOKEN is needed. The first pass times each screen
+of a single session and counts its elements; the second runs N sessions at
+once and reports per-rerun p50/p95 and throughput.
+
+AppTest keeps a process-wide mock runtime, so concurrent sessions run in
+separate processes. By default they are pinned to one CPU, which approximates
+one Streamlit server whose sessions share a single interpreter and GIL; pass
+--cpus to spread them over more cores.
+
+    python benchmarks/bench_app_render.py --sessions 1 4 8 --llm-latency 300
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from bench_data_manager import DEFAULT_RESULTS_DIR, git_commit, summarize  # noqa: E402
+from synthetic_catalog import write_catalog_csv  # noqa: E402
+
+APP_FILE = os.path.join(REPO_DIR, "app.py")
+
+# Canned model reply: a short answer plus criteria, so the chat takes the recommendation path
+STUB_LLM_RESPONSE = json.dumps({
+    "response": "Here is what I found for a 35-year-old non-smoker.",
+    "insurance_criteria": {"age": 35, "gender": "Male", "smoker_status": "Non Smoker", "budget": 800}
+})
+CHAT_MESSAGE = "Find me whole life critical illness plans, I am 35, male and don't smoke"
+
+# Steps of one simulated visit, in order; "chat_message" submits CHAT_MESSAGE on the chat screen
+FLOW = ("welcome", "chat", "chat_message", "insurance_plans", "comparison", "saved")
+
+
+# Replace bot.get_ai_response with a canned reply after ``latency`` seconds
+def stub_llm(latency=0.0):
+    import bot
+
+    def get_ai_response(prompt, system_prompt=None):
+        if latency:
+            time.sleep(latency)
+        return STUB_LLM_RESPONSE
+
+    bot.get_ai_response = get_ai_response
+
+
+# Create a working directory holding a catalog and the app's static files
+def prepare_workdir(rows=None):
+    """Use the bundled 10Life catalog, or a synthetic one with ``rows`` rows."""
+    work_dir = tempfile.mkdtemp(prefix="insurebot-render-")
+    os.symlink(os.path.join(REPO_DIR, "static"), os.path.join(work_dir, "static"))
+    os.chdir(work_dir)
+
+    import data_manager
+    if rows:
+        write_catalog_csv(data_manager.WHOLE_LIFE_CSV, rows)
+    else:
+        shutil.copy(os.path.join(REPO_DIR, data_manager.WHOLE_LIFE_CSV), data_manager.WHOLE_LIFE_CSV)
+    data_manager.clear_catalog_cache()
+    data_manager.initialize_data_files()
+    return work_dir
+
+
+# Count the elements and blocks below a node of the AppTest tree
+def count_elements(node):
+    children = getattr(node, "children", None)
+    if not children:
+        return 1
+    return 1 + sum(count_elements(child) for child in children.values())
+
+
+# Start a simulated session with two plans queued for comparison
+def new_session(timeout):
+    import data_manager
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+    at.run()
+    at.session_state["comparison_plans"] = data_manager.get_segment_plans("Male", 35, "Non Smoker", limit=2)
+    at.session_state["show_comparison"] = True
+    return at
+
+
+# Run one step of the flow, returning (milliseconds, element count)
+def run_step(at, step):
+    start = time.perf_counter()
+    if step == "chat_message":
+        at.chat_input[0].set_value(CHAT_MESSAGE).run()
+    else:
+        at.session_state["current_screen"] = step
+        at.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(f"{step} raised: {at.exception[0].message}")
+    return elapsed, count_elements(at.main) + count_elements(at.sidebar)
+
+
+# Time every screen of a single session
+def bench_screens(repeat, timeout):
+    at = new_session(timeout)
+    samples = {step: [] for step in FLOW}
+    elements = {}
+    for _ in range(repeat):
+        for step in FLOW:
+            elapsed, elements[step] = run_step(at, step)
+            samples[step].append(elapsed)
+    return {step: dict(summarize(samples[step]), elements=elements[step]) for step in FLOW}
+
+
+# Silence Streamlit's bare-mode warnings and replace the LLM call
+def configure_process(llm_latency):
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")
+    stub_llm(llm_latency)
+
+
+# Body of one simulated user's process: warm up, wait for the others, then run the flow
+def session_worker(work_dir, cpus, llm_latency, iterations, timeout, barrier, queue):
+    try:
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+        os.chdir(work_dir)
+        configure_process(llm_latency)
+        at = new_session(timeout)
+        run_step(at, "insurance_plans")
+        barrier.wait()
+
+        started = time.time()
+        samples = {step: [] for step in FLOW}
+        for _ in range(iterations):
+            for step in FLOW:
+                samples[step].append(run_step(at, step)[0])
+        queue.put({"samples": samples, "started": started, "finished": time.time()})
+    except Exception as e:
+        barrier.abort()
+        queue.put({"error": str(e)})
+
+
+# Run ``sessions`` simulated users through the flow at the same time
+def bench_concurrent(work_dir, sessions, iterations, timeout, llm_latency, cpus):
+    """Each process owns one AppTest session; all of them start together."""
+    # AppTest swaps out sys.modules["__main__"], so hand the worker over by its module name
+    from bench_app_render import session_worker as worker_target
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(sessions)
+    queue = context.Queue()
+    workers = [context.Process(target=worker_target, name=f"session-{i}",
+                               args=(work_dir, cpus, llm_latency, iterations, timeout, barrier, queue))
+               for i in range(sessions)]
+    for worker in workers:
+        worker.start()
+    reports = [queue.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    samples = {step: [] for step in FLOW}
+    errors = [report["error"] for report in reports if "error" in report]
+    finished = [report for report in reports if "samples" in report]
+    for report in finished:
+        for step in FLOW:
+            samples[step].extend(report["samples"][step])
+
+    reruns = sum(len(step_samples) for step_samples in samples.values())
+    results = {step: summarize(samples[step]) for step in FLOW if samples[step]}
+    wall = 0.0
+    if finished:
+        results["all_reruns"] = summarize([sample for step in FLOW for sample in samples[step]])
+        wall = max(report["finished"] for report in finished) - min(report["started"] for report in finished)
+    results["throughput"] = {"sessions": sessions, "reruns": reruns, "seconds": round(wall, 4),
+                             "reruns_per_second": round(reruns / wall, 2) if wall else 0.0, "errors": errors}
+    return results
+
+
+# Print the per-screen table and one block per session count
+def print_summary(results):
+    print(f"{'screen':<18} {'p50 ms':>10} {'p95 ms':>10} {'elements':>9}")
+    for step, summary in results["screens"].items():
+        print(f"{step:<18} {summary['p50_ms']:>10.1f} {summary['p95_ms']:>10.1f} {summary['elements']:>9}")
+    for key, operations in results.items():
+        if not key.startswith("sessions_"):
+            continue
+        throughput = operations["throughput"]
+        overall = operations.get("all_reruns", {"p50_ms": 0.0, "p95_ms": 0.0})
+        print(f"{throughput['sessions']:>3} sessions: {throughput['reruns_per_second']:>7.2f} reruns/s"
+              f"  p50 {overall['p50_ms']:>8.1f} ms  p95 {overall['p95_ms']:>8.1f} ms"
+              f"  errors {len(throughput['errors'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark app.py screens and concurrent sessions with AppTest.")
+    parser.add_argument("--rows", type=int, help="use a synthetic catalog of this size instead of the 10Life CSV")
+    parser.add_argument("--repeat", type=int, default=10, help="passes over the flow for the per-screen timings")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8, 16], help="concurrent session counts")
+    parser.add_argument("--iterations", type=int, default=5, help="passes over the flow per concurrent session")
+    parser.add_argument("--llm-latency", type=float, default=0, help="stubbed LLM latency in milliseconds")
+    parser.add_argument("--cpus", type=int, default=1, help="cores the session processes share (0: no pinning)")
+    parser.add_argument("--timeout", type=float, default=120, help="AppTest timeout per rerun in seconds")
+    parser.add_argument("--output", help="results JSON path (default: benchmarks/results/app_render-<commit>.json)")
+    parser.add_argument("--keep-dir", action="store_true", help="keep the temporary data directory")
+    args = parser.parse_args()
+
+    configure_process(args.llm_latency / 1000)
+    cpus = None
+    if args.cpus and hasattr(os, "sched_setaffinity"):
+        cpus = set(sorted(os.sched_getaffinity(0))[:args.cpus])
+
+    original_dir = os.getcwd()
+    work_dir = prepare_workdir(args.rows)
+    try:
+        import data_manager
+        rows = len(data_manager.filter_whole_life_insurance())
+        data_manager.save_plans([plan["id"] for plan in data_manager.get_segment_plans("Female", 40, "Smoker",
+                                                                                        limit=3)])
+        data_manager.flush_user_data()
+
+        # Warm the catalog, segment views and logo cache so the first timed rerun is not a cold start
+        run_step(new_session(args.timeout), "insurance_plans")
+
+        results = {"screens": bench_screens(args.repeat, args.timeout)}
+        for sessions in args.sessions:
+            print(f"[{sessions} sessions] running")
+            results[f"sessions_{sessions}"] = bench_concurrent(work_dir, sessions, args.iterations, args.timeout,
+                                                               args.llm_latency / 1000, cpus)
+    finally:
+        os.chdir(original_dir)
+        if not args.keep_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    import streamlit
+    document = {
+        "benchmark": "app_render",
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "streamlit": streamlit.__version__,
+        "platform": platform.platform(),
+        "parameters": {"repeat": args.repeat, "iterations": args.iterations, "llm_latency_ms": args.llm_latency,
+                       "synthetic_rows": args.rows, "cpus": sorted(cpus) if cpus else None},
+        "sizes": {str(rows): results}
+    }
+    print_summary(results)
+
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"app_render-{document['commit'] or 'nogit'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {output}")
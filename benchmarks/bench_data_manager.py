@@ -0,0 +1,270 @@
+"""Micro-benchmarks for data_manager on synthetic catalogs.
+
+Each catalog size runs in its own temporary directory, since the data paths
+in data_manager are relative to the working directory. Results are written as
+JSON so runs can be compared across commits with compare_results.py.
+
+    python benchmarks/bench_data_manager.py --sizes 1000 10000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from synthetic_catalog import write_catalog_csv  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+# Representative filter calls: the plans screen, the chat, a company page and a paged scan
+FILTER_WORKLOADS = {
+    "segment": {"gender": "Male", "age": 35, "smoker_status": "Non Smoker"},
+    "segment_budget": {"gender": "Female", "age": 40, "smoker_status": "Smoker", "max_price": 600, "min_score": 8},
+    "company": {"company": "FWD | 富衛"},
+    "typed_ranges": {"age": 47, "max_waiting_period_days": 60, "min_payout_percent": 1000},
+    "all_first_page": {"limit": 50}
+}
+
+
+# Summarize latency samples given in milliseconds
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "calls": len(samples),
+        "min_ms": round(samples[0], 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(samples[len(samples) // 2], 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "max_ms": round(samples[-1], 4)
+    }
+
+
+# Time ``func`` ``repeat`` times and summarize the samples in milliseconds
+def measure(func, repeat=1):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples), result
+
+
+# Current commit hash, or None outside a git checkout
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Point data_manager at a fresh working directory
+def reset_data_manager(data_manager, backend="json", flush_delay=0, warm_catalog=False):
+    """Reset the caches and storage; with ``warm_catalog`` the catalog and its
+    segment views are loaded again so the next timed call does not pay for it."""
+    data_manager.clear_catalog_cache()
+    data_manager.initialize_data_files()
+    data_manager.USER_DATA_FLUSH_DELAY = flush_delay
+    data_manager.set_storage_backend(backend)
+    if warm_catalog:
+        data_manager.get_catalog_version()
+
+
+# Remove catalog files so the next load starts from the given source only
+def remove_catalog_files(data_manager, keep=()):
+    for path in (data_manager.WHOLE_LIFE_FILE, data_manager.WHOLE_LIFE_JSONL, data_manager.WHOLE_LIFE_SNAPSHOT):
+        if path not in keep and os.path.exists(path):
+            os.remove(path)
+
+
+# Benchmark catalog import, load, filters and lookups for one catalog size
+def bench_catalog(data_manager, rows, repeat):
+    results = {}
+    write_catalog_csv(data_manager.WHOLE_LIFE_CSV, rows)
+
+    results["import_stream"], _ = measure(lambda: data_manager.import_whole_life_from_csv(stream=True))
+    remove_catalog_files(data_manager)
+    results["import"], _ = measure(data_manager.import_whole_life_from_csv)
+
+    # Cold load parses the JSON and writes the snapshot; the next load maps the snapshot
+    data_manager.clear_catalog_cache()
+    results["load_cold"], _ = measure(data_manager.get_catalog_version)
+    data_manager.clear_catalog_cache()
+    results["load_snapshot"], _ = measure(data_manager.get_catalog_version)
+    results["load_cached"], _ = measure(data_manager.get_catalog_version, repeat)
+
+    for name, criteria in FILTER_WORKLOADS.items():
+        summary, plans = measure(lambda: data_manager.filter_whole_life_insurance(**criteria), repeat)
+        results[f"filter_{name}"] = dict(summary, matches=len(plans))
+
+    results["segment_plans"], _ = measure(
+        lambda: data_manager.get_segment_plans("Male", 35, "Non Smoker", max_price=5000, min_score=0, limit=12), repeat)
+    results["recommend_plans"], _ = measure(
+        lambda: data_manager.recommend_plans({"gender": "Male", "age": 35, "smoker_status": "Non Smoker"}), repeat)
+
+    plan_ids = [plan["id"] for plan in data_manager.filter_whole_life_insurance(limit=rows)]
+    rng = random.Random(0)
+    lookups = [rng.choice(plan_ids) for _ in range(repeat)]
+    lookup_iter = iter(lookups)
+    results["get_plan_by_id"], _ = measure(lambda: data_manager.get_plan_by_id(next(lookup_iter)), repeat)
+    return results, plan_ids
+
+
+# Benchmark save/remove for one backend against a store that already holds many users
+def bench_user_data(data_manager, backend, plan_ids, users, plans_per_user, repeat):
+    results = {}
+    rng = random.Random(1)
+    user_ids = [f"user_{i}" for i in range(users)]
+
+    # Populate through the batch API with one buffered flush
+    reset_data_manager(data_manager, backend, flush_delay=60, warm_catalog=True)
+    start = time.perf_counter()
+    for user_id in user_ids:
+        data_manager.save_plans(rng.sample(plan_ids, min(plans_per_user, len(plan_ids))), user_id)
+    data_manager.flush_user_data()
+    results["populate"] = {"calls": 1, "users": users, "plans_per_user": plans_per_user,
+                           "seconds": round(time.perf_counter() - start, 4)}
+
+    # Durable single writes: the write-behind buffer flushes synchronously
+    reset_data_manager(data_manager, backend, flush_delay=0, warm_catalog=True)
+    targets = [(rng.choice(plan_ids), rng.choice(user_ids)) for _ in range(repeat)]
+    save_iter, remove_iter = iter(targets), iter(targets)
+    results["save_plan"], _ = measure(lambda: data_manager.save_plan(*next(save_iter)), repeat)
+    results["remove_saved_plan"], _ = measure(lambda: data_manager.remove_saved_plan(*next(remove_iter)),
+                                              repeat)
+    read_iter = iter(rng.choice(user_ids) for _ in range(repeat))
+    results["get_saved_plans"], _ = measure(lambda: data_manager.get_saved_plans(next(read_iter)), repeat)
+
+    # Buffered writes: calls only touch the in-memory buffer, then one flush
+    reset_data_manager(data_manager, backend, flush_delay=60, warm_catalog=True)
+    buffered_iter = iter(targets)
+    results["save_plan_buffered"], _ = measure(lambda: data_manager.save_plan(*next(buffered_iter)),
+                                               repeat)
+    results["flush"], _ = measure(data_manager.flush_user_data)
+    return results
+
+
+# Run every benchmark for one catalog size in a fresh temporary directory
+def run_size(rows, repeat, users, plans_per_user, backends, keep_dirs=False):
+    work_dir = tempfile.mkdtemp(prefix=f"insurebot-bench-{rows}-")
+    original_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        # Import after the chdir: data_manager creates its data files on import
+        import data_manager
+        reset_data_manager(data_manager)
+
+        print(f"[{rows} rows] catalog benchmarks in {work_dir}")
+        catalog_results, plan_ids = bench_catalog(data_manager, rows, repeat)
+        size_results = {"catalog": catalog_results}
+        for backend in backends:
+            print(f"[{rows} rows] {backend} user data benchmarks")
+            size_results[f"user_data_{backend}"] = bench_user_data(
+                data_manager, backend, plan_ids, users, plans_per_user, repeat
+            )
+        data_manager.flush_user_data()
+        return size_results
+    finally:
+        os.chdir(original_dir)
+        if not keep_dirs:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# Run each catalog size in its own process and collect the results document
+def run(sizes, repeat, users, plans_per_user, backends, keep_dirs=False):
+    """A child process per size keeps measurements independent, and a size
+    that runs out of memory is recorded as failed instead of ending the run."""
+    import numpy
+    import pandas
+
+    document = {
+        "benchmark": "data_manager",
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "platform": platform.platform(),
+        "parameters": {"repeat": repeat, "users": users, "plans_per_user": plans_per_user, "backends": backends},
+        "sizes": {}
+    }
+
+    for rows in sizes:
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            size_output = f.name
+        command = [sys.executable, os.path.abspath(__file__), "--single-size", str(rows), "--output", size_output,
+                   "--repeat", str(repeat), "--users", str(users), "--plans-per-user", str(plans_per_user),
+                   "--backends", *backends]
+        if keep_dirs:
+            command.append("--keep-dirs")
+        completed = subprocess.run(command)
+        try:
+            if completed.returncode == 0:
+                with open(size_output, "r", encoding="utf-8") as f:
+                    document["sizes"][str(rows)] = json.load(f)
+            else:
+                print(f"[{rows} rows] failed with exit code {completed.returncode}")
+                document["sizes"][str(rows)] = {"error": f"benchmark process exited with code {completed.returncode}"}
+        finally:
+            os.remove(size_output)
+    return document
+
+
+# Print one line per measured operation
+def print_summary(document):
+    for rows, groups in document["sizes"].items():
+        if "error" in groups:
+            print(f"{rows:>8} {groups['error']}")
+            continue
+        for group, operations in groups.items():
+            for name, summary in operations.items():
+                if "p50_ms" in summary:
+                    print(f"{rows:>8} {group:<20} {name:<22} p50 {summary['p50_ms']:>10.3f} ms"
+                          f"  p95 {summary['p95_ms']:>10.3f} ms")
+                else:
+                    print(f"{rows:>8} {group:<20} {name:<22} {summary['seconds']:>10.3f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark data_manager on synthetic catalogs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="catalog row counts")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per timed operation")
+    parser.add_argument("--users", type=int, default=1000, help="users in the user data store")
+    parser.add_argument("--plans-per-user", type=int, default=5, help="saved plans per user")
+    parser.add_argument("--backends", nargs="+", default=["json", "sqlite"], choices=["json", "sqlite"])
+    parser.add_argument("--output", help="results JSON path (default: benchmarks/results/data_manager-<commit>.json)")
+    parser.add_argument("--keep-dirs", action="store_true", help="keep the temporary data directories")
+    parser.add_argument("--single-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: benchmark one size and write its results only
+    if args.single_size:
+        size_results = run_size(args.single_size, args.repeat, args.users, args.plans_per_user, args.backends,
+                                args.keep_dirs)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(size_results, f)
+        sys.exit(0)
+
+    document = run(args.sizes, args.repeat, args.users, args.plans_per_user, args.backends, args.keep_dirs)
+    print_summary(document)
+
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"data_manager-{document['commit'] or 'nogit'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {output}")
@@ -0,0 +1,39 @@
+"""Compare two data_manager benchmark result files operation by operation.
+
+    python benchmarks/compare_results.py benchmarks/results/base.json benchmarks/results/new.json
+"""
+import argparse
+import json
+
+
+# Flatten a results document to {(rows, group, operation): p50 in ms}
+def load_medians(path):
+    with open(path, "r", encoding="utf-8") as f:
+        document = json.load(f)
+    medians = {}
+    for rows, groups in document["sizes"].items():
+        for group, operations in groups.items():
+            if not isinstance(operations, dict):
+                continue
+            for name, summary in operations.items():
+                if isinstance(summary, dict) and "p50_ms" in summary:
+                    medians[(int(rows), group, name)] = summary["p50_ms"]
+    return document.get("commit"), medians
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("base", help="results file of the baseline run")
+    parser.add_argument("new", help="results file of the run to compare")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="flag operations at least this many times slower")
+    args = parser.parse_args()
+
+    base_commit, base = load_medians(args.base)
+    new_commit, new = load_medians(args.new)
+    print(f"{'rows':>8} {'group':<20} {'operation':<22} {base_commit or 'base':>12} {new_commit or 'new':>12}  ratio")
+    for key in sorted(base.keys() & new.keys()):
+        rows, group, name = key
+        ratio = new[key] / base[key] if base[key] else float("inf")
+        flag = "  SLOWER" if ratio >= args.threshold else ""
+        print(f"{rows:>8} {group:<20} {name:<22} {base[key]:>10.3f}ms {new[key]:>10.3f}ms  {ratio:5.2f}x{flag}")
@@ -0,0 +1,90 @@
+"""Synthetic catalogs in the 10Life CSV schema, for benchmarking the data layer."""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Column order of the 10Life export
+CSV_COLUMNS = [
+    "Gender", "Age", "Smoker_Status", "Name", "Company", "TotalScore", "WholeLifeScore", "TermsScore",
+    "PremiumTerm_Years", "AnnualPremium", "Number_of_Covered_Major_Illnesses",
+    "Number_of_Covered_Early_Illnesses", "Maximum_Payout", "Waiting_Period", "Issue_Age"
+]
+
+# Value pools taken from the real catalog
+GENDERS = ["Male", "Female"]
+QUOTE_AGES = [0, 10, 18, 25, 30, 35, 40, 45]
+SMOKER_STATUSES = ["Non Smoker", "Smoker"]
+COMPANIES = [
+    "AIA | 友邦香港", "AXA Hong Kong and Macau | AXA 安盛", "BOC Life | 中銀人壽", "CTF Life | 周大福人壽",
+    "China Life | 中國人壽", "Chubb Life | 安達人壽", "FWD | 富衛", "Generali | 忠意保險", "Manulife | 宏利",
+    "Prudential | 保誠保險", "Sun Life | Sun Life 永明", "Well Link Life | 立橋人壽", "YF Life | 萬通保險"
+]
+PREMIUM_TERMS = [20, 25]
+WAITING_PERIODS = ["90 Days", "60 Days"]
+ISSUE_AGE_MAXIMUMS = [45, 49, 50, 55, 60]
+
+# Products per company, so titles repeat across segments like the real data
+PRODUCTS_PER_COMPANY = 12
+
+# Fraction of rows whose payout is "Not specified"
+UNSPECIFIED_PAYOUT_RATE = 0.03
+
+
+# Format scores as "9.3 / 10"
+def _score_strings(scores):
+    return [f"{score:.1f} / 10" for score in scores]
+
+
+# Build a synthetic catalog as a DataFrame
+def generate_catalog_frame(rows, seed=0):
+    """Return a DataFrame of ``rows`` synthetic plans in the 10Life CSV schema."""
+    rng = np.random.default_rng(seed)
+    company = rng.integers(0, len(COMPANIES), rows)
+    product = rng.integers(0, PRODUCTS_PER_COMPANY, rows)
+    age = rng.choice(QUOTE_AGES, rows)
+    smoker = rng.integers(0, 2, rows)
+
+    whole_life = np.round(rng.uniform(5.0, 10.0, rows), 1)
+    terms = np.round(rng.uniform(5.0, 10.0, rows), 1)
+    total = np.round((whole_life + terms) / 2, 1)
+
+    # Premiums grow with quoted age and smoking, roughly as in the real catalog
+    premium = (rng.uniform(2500, 9000, rows) * (1 + age / 60) * (1 + 0.35 * smoker)).astype(np.int64)
+    payout = np.round(rng.uniform(300, 1500, rows), 1)
+    unspecified = rng.random(rows) < UNSPECIFIED_PAYOUT_RATE
+
+    return pd.DataFrame({
+        "Gender": np.array(GENDERS)[rng.integers(0, 2, rows)],
+        "Age": age,
+        "Smoker_Status": np.array(SMOKER_STATUSES)[smoker],
+        "Name": [f"{COMPANIES[c].split('|')[0].strip()} Protector {p + 1}" for c, p in zip(company, product)],
+        "Company": np.array(COMPANIES)[company],
+        "TotalScore": _score_strings(total),
+        "WholeLifeScore": _score_strings(whole_life),
+        "TermsScore": _score_strings(terms),
+        "PremiumTerm_Years": rng.choice(PREMIUM_TERMS, rows),
+        "AnnualPremium": [f"USD {value:,}" for value in premium],
+        "Number_of_Covered_Major_Illnesses": rng.integers(40, 120, rows),
+        "Number_of_Covered_Early_Illnesses": rng.integers(10, 110, rows),
+        "Maximum_Payout": np.where(unspecified, "Not specified", [f"{value}%" for value in payout]),
+        "Waiting_Period": np.array(WAITING_PERIODS)[rng.integers(0, 2, rows)],
+        "Issue_Age": [f"Age 0 to Age {value}" for value in rng.choice(ISSUE_AGE_MAXIMUMS, rows)],
+    }, columns=CSV_COLUMNS)
+
+
+# Write a synthetic catalog to disk
+def write_catalog_csv(path, rows, seed=0):
+    """Write a synthetic catalog CSV with the same delimiter and encoding as the 10Life export."""
+    generate_catalog_frame(rows, seed).to_csv(path, sep=";", index=False, encoding="utf-8-sig")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("rows", type=int, help="number of plan rows")
+    parser.add_argument("path", help="output CSV path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_catalog_csv(args.path, args.rows, args.seed)
+    print(f"Wrote {args.rows} rows to {args.path}")
@@ -1,58 +1,157 @@
+import hashlib
 import os
+import threading
+
 from openai import OpenAI
 from dotenv import load_dotenv
 
-# Load the prompt template
-def load_prompt_template():
+import llm_cache
+import metrics
+
+# Model endpoint and name; the environment (or .env) can point the bot elsewhere
+DEFAULT_ENDPOINT = "https://models.inference.ai.azure.com"
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Request settings shared by every call
+LLM_TIMEOUT = float(os.environ.get("INSUREBOT_LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = 2
+
+PROMPT_TEMPLATE_FILE = "prompt_template.txt"
+
+# Used when prompt_template.txt is missing
+DEFAULT_TEMPLATE = """Please provide information about insurance and extract key criteria in JSON format."""
+
+DEFAULT_SYSTEM_PROMPT = "You are InsureBot, an AI assistant specializing in insurance. Provide helpful information about insurance in a structured format."
+
+# Configuration, clients and template are shared by every Streamlit session thread
+_llm_lock = threading.Lock()
+_llm_config = {}
+_clients = {}
+_template_cache = {"mtime": None, "text": None, "version": None}
+
+# Read the token, endpoint and model from the environment and .env file
+def load_llm_config():
+    load_dotenv(override=True)
+    return {
+        "token": os.environ.get("GITHUB_TOKEN"),
+        "endpoint": os.environ.get("INSUREBOT_LLM_ENDPOINT", DEFAULT_ENDPOINT),
+        "model": os.environ.get("INSUREBOT_LLM_MODEL", DEFAULT_MODEL)
+    }
+
+# Get the LLM configuration, reading it on first use only
+def get_llm_config():
+    with _llm_lock:
+        if not _llm_config:
+            _llm_config.update(load_llm_config())
+        return dict(_llm_config)
+
+# Re-read the configuration, e.g. after editing .env, and drop clients built with the old one
+def reload_llm_config():
+    """Reload the LLM configuration and close every pooled client."""
+    with _llm_lock:
+        _llm_config.clear()
+        _llm_config.update(load_llm_config())
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+    return get_llm_config()
+
+# Get the shared client for an endpoint, creating it on first use
+def get_llm_client(endpoint=None):
+    """Return one long-lived OpenAI client per endpoint.
+
+    Each client keeps its own keep-alive connection pool, so after the first
+    request a chat message only costs the model round-trip.
+    """
+    config = get_llm_config()
+    endpoint = endpoint or config["endpoint"]
+    if not config["token"]:
+        raise ValueError("GITHUB_TOKEN environment variable not found. Please check your .env file.")
+
+    with _llm_lock:
+        client = _clients.get(endpoint)
+        if client is None:
+            client = _clients[endpoint] = OpenAI(
+                base_url=endpoint,
+                api_key=config["token"],
+                timeout=LLM_TIMEOUT,
+                max_retries=LLM_MAX_RETRIES
+            )
+            metrics.increment("llm.clients_created")
+        return client
+
+# Close every pooled client
+def close_llm_clients():
+    with _llm_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+# Get the prompt template and its version, re-reading the file only when it changes
+def get_prompt_template():
+    """Return (template, version); the version is a short hash of the template text."""
     try:
-        with open("prompt_template.txt", "r") as file:
-            return file.read()
+        mtime = os.stat(PROMPT_TEMPLATE_FILE).st_mtime_ns
     except FileNotFoundError:
-        # Default template in case file doesn't exist
-        return """Please provide information about insurance and extract key criteria in JSON format."""
+        mtime = None
+
+    with _llm_lock:
+        if _template_cache["text"] is not None and _template_cache["mtime"] == mtime:
+            return _template_cache["text"], _template_cache["version"]
+
+    text = DEFAULT_TEMPLATE
+    if mtime is not None:
+        try:
+            with open(PROMPT_TEMPLATE_FILE, "r") as file:
+                text = file.read()
+        except FileNotFoundError:
+            mtime = None
+    version = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+    with _llm_lock:
+        _template_cache.update(mtime=mtime, text=text, version=version)
+    return text, version
+
+# Load the prompt template
+def load_prompt_template():
+    return get_prompt_template()[0]
 
 # Function to get AI response
 def get_ai_response(prompt, system_prompt=None):
     """
     Get a response from the OpenAI model
-    
+
     Args:
         prompt (str): The user's message
         system_prompt (str): Optional custom system prompt
-        
+
     Returns:
         str: The AI's response
+
+    Responses are cached per normalized prompt, template version and model,
+    so a repeated question is answered without a model round-trip. Error
+    fallbacks are never cached.
     """
-    # Force reload environment variables
-    load_dotenv(override=True)
-    token = os.environ.get("GITHUB_TOKEN")
-    endpoint = "https://models.inference.ai.azure.com"
-    model_name = "gpt-4o-mini"
-    
-    print(f"Token: {token[:10]}... (truncated)")  # Print only first 10 chars for security
-    print(f"Endpoint: {endpoint}")
-    print(f"Model: {model_name}")
-    
-    if not token:
-        raise ValueError("GITHUB_TOKEN environment variable not found. Please check your .env file.")
-    
+    config = get_llm_config()
+    template, template_version = get_prompt_template()
+
+    # Use a default system prompt if none provided
+    if system_prompt is None:
+        system_prompt = DEFAULT_SYSTEM_PROMPT
+
+    key = llm_cache.cache_key(prompt, template_version, config["model"], system_prompt)
+    cached = llm_cache.get_cached_response(key)
+    if cached is not None:
+        return cached
+
+    client = get_llm_client(config["endpoint"])
+
     try:
-        client = OpenAI(
-            base_url=endpoint,
-            api_key=token,
-        )
-        
-        # Get the prompt template
-        template = load_prompt_template()
-        print("Loaded template:", template[:100] + "..." if len(template) > 100 else template)
-        
         # Construct the full prompt using the template
         full_prompt = f"{template}\n\nUser Query: {prompt}"
-        
-        # Use a default system prompt if none provided
-        if system_prompt is None:
-            system_prompt = "You are InsureBot, an AI assistant specializing in insurance. Provide helpful information about insurance in a structured format."
-        
+
         response = client.chat.completions.create(
             messages=[
                 {
@@ -64,18 +163,21 @@ def get_ai_response(prompt, system_prompt=None):
                     "content": full_prompt,
                 }
             ],
-            model=model_name,
+            model=config["model"],
             max_tokens=500,
             temperature=0.7
         )
-        
-        return response.choices[0].message.content
+
+        content = response.choices[0].message.content
     except Exception as e:
         # Return a fallback message if there's an error
         print(f"Error getting AI response: {e}")
         return "I'm sorry, I couldn't process that request. Could you please try again?"
 
+    llm_cache.store_response(key, content)
+    return content
+
 # Example usage (will only run if script is executed directly)
 if __name__ == "__main__":
     test_prompt = "What is a deductible in health insurance? Also, can you find me plans for a 35-year-old non-smoker with a budget of $300/month?"
-    print(get_ai_response(test_prompt))
\ No newline at end of file
+    print(get_ai_response(test_prompt))
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+
+class BoundedLRU:
+    """Thread-safe mapping that keeps at most ``max_size`` entries, evicting the least recently used.
+
+    Shared by the card fragment, logo thumbnail and LLM response caches. Values
+    are built outside the lock, so a slow build never blocks other sessions;
+    two sessions missing the same key at once may both build it.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, default=None):
+        """Return the value for ``key`` and mark it recently used, counting a hit or miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key]
+            self._stats["misses"] += 1
+            return default
+
+    def put(self, key, value):
+        """Store ``value`` as the most recently used entry, evicting the oldest above the cap."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_build(self, key, build):
+        """Return the cached value for ``key``, calling ``build()`` and caching its result on a miss.
+
+        A build returning None is not cached.
+        """
+        value = self.get(key)
+        if value is None:
+            value = build()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def pop(self, key):
+        """Remove ``key``; returns whether it was cached."""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return the hit/miss counters and the number of cached entries."""
+        with self._lock:
+            return dict(self._stats, size=len(self._entries))
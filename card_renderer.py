@@ -0,0 +1,167 @@
+import html
+
+from bounded_cache import BoundedLRU
+
+# Maximum number of HTML fragments kept in memory
+FRAGMENT_CACHE_SIZE = 4096
+
+# Cached fragments keyed by (kind, plan id, catalog version, extra)
+_fragment_cache = BoundedLRU(FRAGMENT_CACHE_SIZE)
+
+# Read a score from the plan details as a float
+def _score(plan, field):
+    try:
+        return float(plan["details"].get(field, 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+# Format a score out of 10, showing "N/A" for missing sub-scores
+def format_score(value, allow_zero=False):
+    return f"{value:.1f}" if value > 0 or allow_zero else "N/A"
+
+# Convert a total score to a five-star rating
+def star_rating(total_score):
+    if total_score >= 9:
+        return '★★★★★'
+    if total_score >= 7:
+        return '★★★★☆'
+    if total_score >= 5:
+        return '★★★☆☆'
+    if total_score >= 3:
+        return '★★☆☆☆'
+    return '★☆☆☆☆'
+
+# Format a monthly price as the annual premium shown on cards
+def format_annual_premium(price):
+    try:
+        return f"{float(price) * 12:.0f}"
+    except (TypeError, ValueError):
+        return "N/A"
+
+# Escape a plan field for inclusion in HTML
+def _text(value):
+    return html.escape(str(value))
+
+# Return a cached fragment, building it on the first request
+def _cached(key, build):
+    return _fragment_cache.get_or_build(key, build)
+
+# Build the HTML for a plan card on the Insurance Plans screen
+def _build_plan_card(plan, value_pick):
+    total_score = _score(plan, "total_score")
+    score_rows = (
+        ("Total Score", format_score(total_score, allow_zero=True)),
+        ("Whole Life CI Coverage Score", format_score(_score(plan, "whole_life_score"))),
+        ("Terms Score", format_score(_score(plan, "terms_score")))
+    )
+    parts = [
+        '<div class="insurance-card">',
+        f'<div class="card-rating"><span>Star Rating</span><span>{star_rating(total_score)}</span></div>',
+        f'<div class="company-logo">{_text(plan["company"])}</div>',
+        f'<div class="plan-name">{_text(plan["title"])}</div>'
+    ]
+    if value_pick:
+        parts.append('<div class="value-pick">💰 Best value for its score</div>')
+    parts.append("<div style='margin: 20px 0;'>")
+    for label, value in score_rows:
+        parts.append(
+            f'<div class="detail-row"><div class="detail-label">{label}</div>'
+            f'<div class="detail-value">{value} <span style="font-weight: normal; color: #666;">/10</span></div></div>'
+        )
+    parts.append("</div>")
+    parts.append(
+        '<div class="premium-row"><div class="premium-label">Annual Premium</div>'
+        f'<div class="premium-value">USD {format_annual_premium(plan["price"])} '
+        '<span style="font-weight: normal; font-size: 14px;">/ Year</span></div></div>'
+    )
+    parts.append("</div>")
+    return "".join(parts)
+
+# Get the HTML for a plan card, cached per plan and catalog version
+def plan_card_html(plan, catalog_version, value_pick=False):
+    """Return the Insurance Plans card for ``plan`` as one HTML fragment."""
+    return _cached(("plan_card", plan["id"], catalog_version, value_pick),
+                   lambda: _build_plan_card(plan, value_pick))
+
+# Build the HTML for a card on the Saved Plans screen
+def _build_saved_plan_card(plan):
+    parts = [
+        '<div style="border-radius: 12px; padding: 20px; margin-bottom: 20px; position: relative; '
+        'background-color: white; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">',
+        '<div style="position: absolute; top: 10px; right: 10px; background-color: #1E88E5; color: white; '
+        'padding: 5px 10px; border-radius: 4px; font-size: 12px; font-weight: bold;">Saved</div>',
+        '<div style="text-align: center; margin: 10px auto; padding: 10px; font-weight: bold; color: #333; '
+        f'font-size: 18px;">{_text(plan["company"])}</div>',
+        '<div style="text-align: center; font-size: 20px; font-weight: bold; margin: 15px 0; color: #333;">'
+        f'{_text(plan["title"])}</div>',
+        '<p style="text-align: center; color: #666; font-size: 14px;">'
+        f'Saved on: {_text(plan.get("date_saved", "Unknown date"))}</p>'
+    ]
+    if plan.get("features"):
+        features = "".join(f'<li><span style="color: #4CAF50;">✓</span> {_text(feature)}</li>'
+                           for feature in plan["features"][:2])
+        parts.append(f'<ul style="list-style-type: none; padding-left: 20px; margin-bottom: 15px;">{features}</ul>')
+    parts.append(
+        '<div style="display: flex; justify-content: space-between; align-items: center; margin-top: 15px; '
+        'padding-top: 15px; border-top: 1px solid #eee;">'
+        f'<span style="font-size: 1.3rem; font-weight: bold; color: #333;">${_text(plan["price"])}/month</span></div>'
+    )
+    parts.append("</div>")
+    return "".join(parts)
+
+# Get the HTML for a saved plan card, cached per plan, save date and catalog version
+def saved_plan_card_html(plan, catalog_version):
+    """Return the Saved Plans card for ``plan`` as one HTML fragment."""
+    return _cached(("saved_card", plan["id"], catalog_version, plan.get("date_saved")),
+                   lambda: _build_saved_plan_card(plan))
+
+# Rows of the comparison table, as (label, function returning the cell HTML)
+COMPARISON_SECTIONS = {
+    "scores": (
+        ("Total Score", lambda plan: f"<span style='color: #00bfa5;'>{format_score(_score(plan, 'total_score'), allow_zero=True)}</span>"
+                                     " <span style='font-weight: normal; color: #666;'>/10</span>"),
+        ("Whole Life CI Coverage Score", lambda plan: f"{format_score(_score(plan, 'whole_life_score'))}"
+                                                      " <span style='font-weight: normal; color: #666;'>/10</span>"),
+        ("Terms Score", lambda plan: f"{format_score(_score(plan, 'terms_score'))}"
+                                     " <span style='font-weight: normal; color: #666;'>/10</span>")
+    ),
+    "coverage": (
+        ("Annual Premium", lambda plan: f"<b>USD {format_annual_premium(plan['price'])}</b>"
+                                        " <span style='font-weight: normal; color: #666;'>/ Year</span>"),
+        ("Premium Term (Years)", lambda plan: _text(plan['details'].get('premium_term_years', 'N/A'))),
+        ("Major Illnesses Covered", lambda plan: _text(plan['details'].get('major_illnesses', 'N/A'))),
+        ("Early Illnesses Covered", lambda plan: _text(plan['details'].get('early_illnesses', 'N/A'))),
+        ("Maximum Payout", lambda plan: _text(plan['details'].get('maximum_payout', 'N/A'))),
+        ("Waiting Period", lambda plan: _text(plan['details'].get('waiting_period', 'N/A'))),
+        ("Issue Age", lambda plan: _text(plan['details'].get('issue_age', 'N/A')))
+    )
+}
+
+# Get the HTML for the label column of a comparison section
+def comparison_labels_html(section):
+    """Return the row labels of a comparison section as one HTML fragment."""
+    return "".join(f"<div style='font-weight: bold; margin-bottom: 15px;'>{label}</div>"
+                   for label, _ in COMPARISON_SECTIONS[section])
+
+# Build the HTML for one plan's column of a comparison section
+def _build_comparison_column(plan, section):
+    weight = "bold" if section == "scores" else "normal"
+    return "".join(f"<div style='margin-bottom: 15px; font-weight: {weight};'>{cell(plan)}</div>"
+                   for _, cell in COMPARISON_SECTIONS[section])
+
+# Get the HTML for one plan's column of a comparison section, cached per plan and catalog version
+def comparison_column_html(plan, catalog_version, section):
+    """Return ``plan``'s values for a comparison section as one HTML fragment."""
+    return _cached(("comparison", plan["id"], catalog_version, section),
+                   lambda: _build_comparison_column(plan, section))
+
+# Get fragment cache counters
+def get_fragment_cache_stats():
+    """Return the fragment cache hit/miss counters and its current size."""
+    stats = _fragment_cache.stats()
+    return {"hits": stats["hits"], "misses": stats["misses"], "cached_fragments": stats["size"]}
+
+# Drop every cached fragment
+def clear_fragment_cache():
+    """Empty the fragment cache."""
+    _fragment_cache.clear()
@@ -3,6 +3,7 @@ import random
 import json
 from datetime import datetime
 import bot  # Import the bot module
+import metrics
 
 # Sample knowledge base for the chatbot
 KNOWLEDGE_BASE = {
@@ -102,7 +103,8 @@ class InsuranceChatbot:
                 context_prompt = self._build_context_prompt(user_input)
                 
                 # Get response from the AI
-                ai_response = bot.get_ai_response(context_prompt)
+                with metrics.timer("chatbot.llm_call"):
+                    ai_response = bot.get_ai_response(context_prompt)
                 
                 # Try to parse JSON response
                 try:
@@ -125,7 +127,12 @@ class InsuranceChatbot:
                     # Add a flag to indicate if this is a search query with criteria
                     response = json_response.get("response", ai_response)
                     if has_search_criteria:
-                        return {"response": response, "has_search_criteria": True}
+                        metrics.increment("chatbot.search_queries")
+                        return {
+                            "response": response,
+                            "has_search_criteria": True,
+                            "insurance_criteria": json_response["insurance_criteria"]
+                        }
                     else:
                         return response
                 
@@ -140,6 +147,7 @@ class InsuranceChatbot:
                 
             except Exception as e:
                 print(f"Error using AI response: {e}")
+                metrics.increment("chatbot.rule_based_fallbacks")
                 # Fall back to rule-based responses
                 return self._get_rule_based_response(user_input)
         else:
@@ -266,6 +274,7 @@ class InsuranceChatbot:
 
 
 # Simple function to generate chatbot response
+@metrics.timed("chatbot.response")
 def get_chatbot_response(user_input, context=None):
     """Get a response from the chatbot based on user input and context"""
     chatbot = InsuranceChatbot()
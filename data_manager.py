@@ -1,19 +1,67 @@
 import json
 import os
 import csv
+import hashlib
+import numpy as np
 import pandas as pd
 import re
+import tempfile
+import threading
+import time
 from datetime import datetime
 
+from plan_store import (
+    ISSUE_AGE_PATTERN, PARETO_SCORE_COLUMNS, PAYOUT_PERCENT_PATTERN, WAITING_DAYS_PATTERN, PlanStore,
+    read_snapshot_header, write_plans_snapshot
+)
+import metrics
+from storage import JsonStorage, SqliteStorage, WriteBehindStorage, migrate_storage
+
 # Default data paths
 DATA_DIR = "data"
 SAVED_PLANS_FILE = os.path.join(DATA_DIR, "saved_plans.json")
 USER_PROFILES_FILE = os.path.join(DATA_DIR, "user_profiles.json")
+USER_DB_FILE = os.path.join(DATA_DIR, "insurebot.db")
+
+# Backend for saved plans and user profiles: "json" (default) or "sqlite"
+STORAGE_BACKEND = os.environ.get("INSUREBOT_STORAGE", "json")
+
+# Seconds user data changes are buffered before being written in one batch
+USER_DATA_FLUSH_DELAY = 0.5
+_storage = None
+_storage_lock = threading.Lock()
 
 # Hong Kong whole life insurance constants
 WHOLE_LIFE_FILE = os.path.join(DATA_DIR, "whole_life_insurance.json")
 WHOLE_LIFE_CSV = "Compare Whole Life Critical Illness Insurance _ 10Life.csv"
 
+# CSV columns that identify a plan row; plan ids are a stable hash of their values
+PLAN_KEY_COLUMNS = ['Name', 'Company', 'Gender', 'Age', 'Smoker_Status', 'PremiumTerm_Years']
+
+# Positional ids assigned by the original importer ("whole_life_<row>"); content-hash ids have 16 hex digits
+LEGACY_PLAN_ID_PATTERN = re.compile(r"^whole_life_\d{1,15}$")
+
+# Streaming import writes one plan per line and reads the CSV in bounded chunks
+WHOLE_LIFE_JSONL = os.path.join(DATA_DIR, "whole_life_insurance.jsonl")
+IMPORT_CHUNK_ROWS = 10000
+
+# Compiled binary snapshot of the catalog, memory-mapped at startup
+WHOLE_LIFE_SNAPSHOT = os.path.join(DATA_DIR, "whole_life_insurance.snapshot")
+
+# Process-wide catalog cache, shared by every Streamlit session in this process.
+# The columnar PlanStore is kept until the catalog file's mtime or size changes.
+_catalog_lock = threading.RLock()
+_catalog_cache = {"signature": None, "store": None, "version": 0}
+_catalog_stats = {"hits": 0, "misses": 0, "reloads": 0, "snapshot_loads": 0, "snapshot_writes": 0}
+
+# Timing of the most recent CSV import
+_last_import_stats = {}
+
+# Segments offered by the Insurance Plans screen, materialized at catalog load
+SEGMENT_VIEW_GENDERS = ("Male", "Female")
+SEGMENT_VIEW_AGES = range(18, 81)
+SEGMENT_VIEW_SMOKER_STATUSES = ("Non Smoker", "Smoker")
+
 # Function to clean currency values
 def clean_currency(value):
     if isinstance(value, (int, float)):
@@ -37,6 +85,35 @@ def clean_score(value):
         return float(clean_value) if clean_value else 0.0
     return 0.0
 
+# Vectorized clean_currency for a whole column
+def clean_currency_column(series):
+    digits = series.astype(str).str.replace(',', '', regex=False).str.replace(r'[^\d.]', '', regex=True)
+    return pd.to_numeric(digits, errors='coerce').astype(float).fillna(0.0)
+
+# Vectorized clean_score for a whole column (e.g., "9.9 / 10" -> 9.9)
+def clean_score_column(series):
+    score_part = series.astype(str).str.split('/', n=1).str[0]
+    digits = score_part.str.replace(r'[^\d.]', '', regex=True)
+    return pd.to_numeric(digits, errors='coerce').astype(float).fillna(0.0)
+
+# Convert a numeric column to a list with None for missing values
+def _optional_values(series, cast):
+    return [cast(value) if pd.notna(value) else None for value in series.tolist()]
+
+# Vectorized parse of Maximum_Payout (e.g., "1374.0%" -> 1374.0), None if not specified
+def payout_percent_column(series):
+    return _optional_values(pd.to_numeric(series.astype(str).str.extract(PAYOUT_PERCENT_PATTERN)[0]), float)
+
+# Vectorized parse of Waiting_Period (e.g., "90 Days" -> 90)
+def waiting_days_column(series):
+    days = series.astype(str).str.extract(WAITING_DAYS_PATTERN, flags=re.IGNORECASE)[0]
+    return _optional_values(pd.to_numeric(days), int)
+
+# Vectorized parse of Issue_Age (e.g., "Age 0 to Age 50" -> (0, 50))
+def issue_age_columns(series):
+    bounds = series.astype(str).str.extract(ISSUE_AGE_PATTERN, flags=re.IGNORECASE)
+    return _optional_values(pd.to_numeric(bounds[0]), int), _optional_values(pd.to_numeric(bounds[1]), int)
+
 # Create data directory if it doesn't exist
 def ensure_data_dir():
     if not os.path.exists(DATA_DIR):
@@ -56,73 +133,174 @@ def initialize_data_files():
         with open(USER_PROFILES_FILE, 'w') as f:
             json.dump({}, f, indent=4)
 
+# Create a uniquely named temporary file next to ``path`` for an atomic os.replace
+def _temp_path_for(path):
+    """Return the path of a new empty file in ``path``'s directory.
+
+    Every writer gets its own file, so processes building the same catalog or
+    snapshot at once never interleave their writes.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    # mkstemp creates the file private to the owner; match a normally created file
+    os.chmod(temp_path, 0o644)
+    return temp_path
+
+# Render one identifying value the same way whatever dtype pandas read its column as
+def _plan_key_text(value):
+    """Return integral floats as ints ("25.0" -> "25") and every NaN as "nan".
+
+    One empty cell turns an integer column (or, when streaming, one chunk of
+    it) into floats; without this every other row of that column would get a
+    new id.
+    """
+    if isinstance(value, (float, np.floating)):
+        if value != value:
+            return "nan"
+        if float(value).is_integer():
+            return str(int(value))
+    return str(value)
+
+# Hash the identifying values of a plan row into a stable plan id
+def _plan_id_from_key(key_values, seen):
+    digest = hashlib.sha1("\x1f".join(key_values).encode("utf-8")).hexdigest()[:16]
+    
+    # Rows repeating the same key get an occurrence suffix so ids stay unique
+    occurrence = seen.get(digest, 0)
+    seen[digest] = occurrence + 1
+    return f"whole_life_{digest}" if occurrence == 0 else f"whole_life_{digest}_{occurrence}"
+
+# Get stable content-hash ids for the rows of a 10Life CSV frame
+def plan_ids_for_frame(df, seen=None):
+    """Return plan ids derived from the PLAN_KEY_COLUMNS of each row.
+
+    Pass the same ``seen`` dict across chunks of one feed so repeated keys get
+    distinct ids.
+    """
+    seen = {} if seen is None else seen
+    key_columns = [[_plan_key_text(value) for value in df[column].tolist()] for column in PLAN_KEY_COLUMNS]
+    return [_plan_id_from_key(key_values, seen) for key_values in zip(*key_columns)]
+
+# Get the stable content-hash id of an imported plan dict
+def plan_id_for_plan(plan, seen=None):
+    """Return the id the importer assigns to a plan with this plan's identifying fields."""
+    details = plan.get("details", {})
+    key_values = [
+        plan.get("title"), plan.get("company"), details.get("gender"), details.get("age"),
+        details.get("smoker_status"), details.get("premium_term_years")
+    ]
+    return _plan_id_from_key([_plan_key_text(value) for value in key_values], {} if seen is None else seen)
+
+# Build plan dicts from a DataFrame of 10Life CSV rows
+def build_plans_from_frame(df, seen=None):
+    """Convert 10Life CSV rows to plan dicts, parsing each column in one pass."""
+    plan_ids = plan_ids_for_frame(df, seen)
+    
+    # Clean scores and premiums column-wise instead of per row
+    whole_life_scores = clean_score_column(df['WholeLifeScore']).tolist()
+    terms_scores = clean_score_column(df['TermsScore']).tolist()
+    total_scores = clean_score_column(df['TotalScore']).tolist()
+    annual_premium = clean_currency_column(df['AnnualPremium'])
+    annual_premium_values = annual_premium.tolist()
+    monthly_prices = (annual_premium / 12).tolist()  # Convert annual to monthly
+    
+    # Feature strings are derived column-wise as well
+    major_features = (df['Number_of_Covered_Major_Illnesses'].astype(str) + " Major Illnesses").tolist()
+    early_features = (df['Number_of_Covered_Early_Illnesses'].astype(str) + " Early Stage Illnesses").tolist()
+    payout_features = ("Maximum Payout: " + df['Maximum_Payout'].astype(str)).tolist()
+    term_features = ("Premium Term: " + df['PremiumTerm_Years'].astype(str) + " years").tolist()
+    
+    # Typed versions of the free-text payout, waiting period and issue age columns
+    payout_percents = payout_percent_column(df['Maximum_Payout'])
+    waiting_days = waiting_days_column(df['Waiting_Period'])
+    issue_age_mins, issue_age_maxes = issue_age_columns(df['Issue_Age'])
+    
+    rows = zip(
+        df['Name'].tolist(), df['Company'].tolist(), df['WholeLifeScore'].tolist(),
+        df['TermsScore'].tolist(), df['TotalScore'].tolist(), df['Gender'].tolist(),
+        df['Age'].tolist(), df['Smoker_Status'].tolist(), df['PremiumTerm_Years'].tolist(),
+        df['AnnualPremium'].tolist(), df['Number_of_Covered_Major_Illnesses'].tolist(),
+        df['Number_of_Covered_Early_Illnesses'].tolist(), df['Maximum_Payout'].tolist(),
+        df['Waiting_Period'].tolist(), df['Issue_Age'].tolist()
+    )
+    
+    insurance_plans = []
+    for i, (name, company, original_whole_life, original_terms, original_total, gender, age,
+            smoker_status, premium_term, annual_premium_text, major, early, payout, waiting,
+            issue_age) in enumerate(rows):
+        # Create a plan structure that matches what the application expects
+        insurance_plans.append({
+            "id": plan_ids[i],
+            "title": name,
+            "company": company,
+            "type": "whole_life",
+            "price": monthly_prices[i],
+            "features": [major_features[i], early_features[i], payout_features[i], term_features[i]],
+            "details": {
+                "whole_life_score": whole_life_scores[i],
+                "terms_score": terms_scores[i],
+                "total_score": total_scores[i],
+                "original_whole_life_score": original_whole_life,  # Keep original for display
+                "original_terms_score": original_terms,  # Keep original for display
+                "original_total_score": original_total,  # Keep original for display
+                "gender": gender,
+                "age": age,
+                "smoker_status": smoker_status,
+                "premium_term_years": premium_term,
+                "annual_premium": annual_premium_text,  # Keep original for display
+                "annual_premium_value": annual_premium_values[i],  # Cleaned value for calculations
+                "major_illnesses": major,
+                "early_illnesses": early,
+                "maximum_payout": payout,
+                "waiting_period": waiting,
+                "issue_age": issue_age,
+                "maximum_payout_percent": payout_percents[i],
+                "waiting_period_days": waiting_days[i],
+                "issue_age_min": issue_age_mins[i],
+                "issue_age_max": issue_age_maxes[i]
+            },
+            "starred": False  # Default value
+        })
+    return insurance_plans
+
 # Function to import the CSV data into structured JSON
-def import_whole_life_from_csv():
-    """Import whole life insurance data from CSV file."""
+@metrics.timed("catalog.import")
+def import_whole_life_from_csv(stream=False, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Import whole life insurance data from CSV file.
+
+    With ``stream=True`` the CSV is read in chunks of ``chunk_rows`` rows and
+    plans are written incrementally to the JSON Lines catalog, so memory use
+    stays bounded regardless of the feed size.
+    """
     ensure_data_dir()
     
     if not os.path.exists(WHOLE_LIFE_CSV):
         print(f"Error: CSV file '{WHOLE_LIFE_CSV}' not found.")
         return False
     
+    if stream:
+        return _stream_import_whole_life_from_csv(chunk_rows)
+    
     try:
+        started = time.perf_counter()
+        
         # Import data from CSV with semicolon delimiter
         df = pd.read_csv(WHOLE_LIFE_CSV, delimiter=';', encoding='utf-8')
         print(f"Successfully read CSV with {len(df)} rows.")
         
         # Map columns to expected structure for whole life insurance
-        insurance_plans = []
+        insurance_plans = build_plans_from_frame(df)
+        parsed = time.perf_counter()
         
-        for _, row in df.iterrows():
-            try:
-                # Clean score values
-                whole_life_score = clean_score(row['WholeLifeScore'])
-                terms_score = clean_score(row['TermsScore'])
-                total_score = clean_score(row['TotalScore'])
-                
-                # Create a plan structure that matches what the application expects
-                plan = {
-                    "id": f"whole_life_{len(insurance_plans)}",
-                    "title": row['Name'],
-                    "company": row['Company'],
-                    "type": "whole_life",
-                    "price": clean_currency(row['AnnualPremium']) / 12,  # Convert annual to monthly
-                    "features": [
-                        f"{row['Number_of_Covered_Major_Illnesses']} Major Illnesses",
-                        f"{row['Number_of_Covered_Early_Illnesses']} Early Stage Illnesses",
-                        f"Maximum Payout: {row['Maximum_Payout']}",
-                        f"Premium Term: {row['PremiumTerm_Years']} years"
-                    ],
-                    "details": {
-                        "whole_life_score": whole_life_score,
-                        "terms_score": terms_score,
-                        "total_score": total_score,
-                        "original_whole_life_score": row['WholeLifeScore'],  # Keep original for display
-                        "original_terms_score": row['TermsScore'],  # Keep original for display
-                        "original_total_score": row['TotalScore'],  # Keep original for display
-                        "gender": row['Gender'],
-                        "age": row['Age'],
-                        "smoker_status": row['Smoker_Status'],
-                        "premium_term_years": row['PremiumTerm_Years'],
-                        "annual_premium": row['AnnualPremium'],  # Keep original for display
-                        "annual_premium_value": clean_currency(row['AnnualPremium']),  # Cleaned value for calculations
-                        "major_illnesses": row['Number_of_Covered_Major_Illnesses'],
-                        "early_illnesses": row['Number_of_Covered_Early_Illnesses'],
-                        "maximum_payout": row['Maximum_Payout'],
-                        "waiting_period": row['Waiting_Period'],
-                        "issue_age": row['Issue_Age']
-                    },
-                    "starred": False  # Default value
-                }
-                insurance_plans.append(plan)
-            except Exception as e:
-                print(f"Error processing row: {e}")
-                continue
-        
-        # Save to JSON file
-        with open(WHOLE_LIFE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(insurance_plans, f, ensure_ascii=False, indent=4)
+        # Resolve legacy saved plan ids and keep copies of dropped saved plans before the catalog is replaced
+        id_map = _legacy_saved_plan_id_map()
+        _snapshot_dropped_saved_plans(_saved_plan_import_ids(id_map), {plan["id"] for plan in insurance_plans})
+        _write_catalog_file(insurance_plans, WHOLE_LIFE_FILE)
+        if id_map:
+            _remap_saved_plan_ids(id_map)
         
+        _record_import_stats(len(insurance_plans), parsed - started, time.perf_counter() - parsed)
         print(f"Successfully converted CSV to JSON and saved to {WHOLE_LIFE_FILE}")
         return True
     
@@ -132,166 +310,775 @@ def import_whole_life_from_csv():
         traceback.print_exc()
         return False
 
-# Get whole life insurance plans
-def get_whole_life_insurance():
-    """Retrieve all whole life insurance plans."""
-    # Import if JSON file doesn't exist
-    if not os.path.exists(WHOLE_LIFE_FILE):
-        import_whole_life_from_csv()
+# Import the CSV chunk by chunk into the JSON Lines catalog
+def _stream_import_whole_life_from_csv(chunk_rows):
+    # Write to a temporary file so readers never see a half-written catalog
+    temp_file = _temp_path_for(WHOLE_LIFE_JSONL)
+    rows = 0
+    seen_keys = {}
+    parse_seconds = 0.0
+    write_seconds = 0.0
     
     try:
-        with open(WHOLE_LIFE_FILE, "r", encoding="utf-8") as f:
-            whole_life_plans = json.load(f)
-        return whole_life_plans
+        # Resolve legacy saved plan ids before the catalog they refer to is replaced
+        id_map = _legacy_saved_plan_id_map()
+        saved_ids = _saved_plan_import_ids(id_map)
+        # Only the saved plans' ids are tracked, so memory stays bounded
+        saved_targets = set(saved_ids.values())
+        incoming_saved_ids = set()
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            chunk_started = time.perf_counter()
+            for chunk in pd.read_csv(WHOLE_LIFE_CSV, delimiter=';', encoding='utf-8', chunksize=chunk_rows):
+                plans = build_plans_from_frame(chunk, seen=seen_keys)
+                if saved_targets:
+                    incoming_saved_ids.update(plan["id"] for plan in plans if plan["id"] in saved_targets)
+                parsed = time.perf_counter()
+                parse_seconds += parsed - chunk_started
+                
+                f.writelines(json.dumps(plan, ensure_ascii=False) + "\n" for plan in plans)
+                rows += len(plans)
+                chunk_started = time.perf_counter()
+                write_seconds += chunk_started - parsed
+        _snapshot_dropped_saved_plans(saved_ids, incoming_saved_ids)
+        os.replace(temp_file, WHOLE_LIFE_JSONL)
+        if id_map:
+            _remap_saved_plan_ids(id_map)
     except Exception as e:
-        print(f"Error loading whole life insurance data: {str(e)}")
-        # Return empty list as fallback
-        return []
-
-# Filter whole life insurance plans by criteria
-def filter_whole_life_insurance(gender=None, age=None, smoker_status=None, max_price=None, min_score=None):
-    """Filter whole life insurance plans based on criteria."""
-    all_plans = get_whole_life_insurance()
-    filtered_plans = []
-    
-    for plan in all_plans:
-        # Default to include the plan
-        include_plan = True
-        
-        # Filter by gender
-        if gender and plan["details"]["gender"] != gender:
-            include_plan = False
-        
-        # Filter by age - check if the input age is within the plan's age range
-        if age:
-            try:
-                plan_age = int(plan["details"]["age"])
-                if age < plan_age:
-                    include_plan = False
-            except (ValueError, KeyError):
-                pass
-        
-        # Filter by smoker status
-        if smoker_status and plan["details"]["smoker_status"] != smoker_status:
-            include_plan = False
-        
-        # Filter by max price
-        if max_price and plan["price"] > max_price:
-            include_plan = False
-        
-        # Filter by minimum score
-        if min_score:
-            try:
-                plan_score = float(plan["details"]["total_score"])
-                if plan_score < min_score:
-                    include_plan = False
-            except (ValueError, KeyError):
-                pass
-        
-        # Add plan to filtered list if it meets all criteria
-        if include_plan:
-            filtered_plans.append(plan)
+        print(f"Error streaming CSV file: {str(e)}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        return False
     
-    return filtered_plans
+    _record_import_stats(rows, parse_seconds, write_seconds)
+    print(f"Successfully streamed CSV to JSON Lines and saved to {WHOLE_LIFE_JSONL}")
+    return True
 
-# Get plan by ID
-def get_plan_by_id(plan_id):
-    """Get a specific plan by ID."""
-    # Check different plan types
-    all_plans = get_whole_life_insurance()
+# Compare two plan dicts ignoring their ids and UI flags
+def _same_plan_content(plan, other):
+    ignored = ("id", "starred")
+    return ({k: v for k, v in plan.items() if k not in ignored} ==
+            {k: v for k, v in other.items() if k not in ignored})
+
+# Map every positional id in the current catalog to its content-hash id
+def _catalog_legacy_id_map(plans):
+    id_map = {}
+    seen_keys = {}
+    for plan in plans:
+        plan_id = plan_id_for_plan(plan, seen_keys)
+        if plan.get("id") != plan_id:
+            id_map[plan.get("id")] = plan_id
+    return id_map
+
+# Map the legacy positional ids of saved plans to content-hash ids
+def _legacy_saved_plan_id_map(catalog_id_map=None):
+    """Return {legacy id: hash id} for saved plans still stored under a positional id.
+
+    Ids are resolved against the current catalog while it still has positional
+    ids, and otherwise from the snapshot kept on the saved entry. Call this
+    before the catalog is replaced.
+    """
+    entries = [entry for user_entries in get_storage().all_saved_plans().values() for entry in user_entries
+               if LEGACY_PLAN_ID_PATTERN.match(entry['id'])]
+    if not entries:
+        return {}
     
-    # Search for the plan with the matching ID
-    for plan in all_plans:
-        if plan["id"] == plan_id:
-            return plan
+    # Only consult a catalog that exists; loading a missing one would import the CSV again
+    if catalog_id_map is None:
+        catalog_id_map = {}
+        if _catalog_source() is not None or os.path.exists(WHOLE_LIFE_SNAPSHOT):
+            catalog_id_map = _catalog_legacy_id_map(get_whole_life_insurance())
     
-    return None
+    id_map = {}
+    for entry in entries:
+        if entry['id'] in catalog_id_map:
+            id_map[entry['id']] = catalog_id_map[entry['id']]
+        elif entry['snapshot'] is not None:
+            id_map[entry['id']] = plan_id_for_plan(entry['snapshot'])
+    return id_map
 
-# Get a user's saved plans
-def get_saved_plans(user_id="default"):
-    """Get a user's saved plans."""
-    if not os.path.exists(SAVED_PLANS_FILE):
-        initialize_data_files()
-    
+# Get the ids of saved plans served from the catalog, with the id each will have after an import
+def _saved_plan_import_ids(id_map):
+    """Return {saved plan id: id after the import} for saved entries without a snapshot.
+
+    ``id_map`` is the legacy id migration the import applies. Entries that
+    already carry a snapshot do not depend on the catalog.
+    """
+    return {entry['id']: id_map.get(entry['id'], entry['id'])
+            for user_entries in get_storage().all_saved_plans().values() for entry in user_entries
+            if entry['snapshot'] is None}
+
+# Keep a copy of every saved plan that the incoming catalog drops
+def _snapshot_dropped_saved_plans(saved_ids, incoming_ids):
+    """Snapshot saved plans whose id after the import is not in ``incoming_ids``.
+
+    Saved plans only reference the catalog, so call this before it is
+    replaced; the snapshots are taken from the current catalog.
+    """
+    dropped = [saved_id for saved_id, new_id in saved_ids.items() if new_id not in incoming_ids]
+    # Only consult a catalog that exists; loading a missing one would import the CSV again
+    if not dropped or (_catalog_source() is None and not os.path.exists(WHOLE_LIFE_SNAPSHOT)):
+        return
+    snapshots = {saved_id: dict(plan, id=saved_id)
+                 for saved_id, plan in zip(dropped, get_plans_by_ids(dropped)) if plan is not None}
+    if snapshots:
+        get_storage().set_snapshots(snapshots)
+
+# Write plans to a catalog file atomically, in that file's format
+def _write_catalog_file(plans, path):
+    temp_file = _temp_path_for(path)
     try:
-        with open(SAVED_PLANS_FILE, 'r') as f:
-            saved_plans_data = json.load(f)
-        
-        # If user_id key doesn't exist, return empty list
-        return saved_plans_data.get(user_id, [])
-    except json.JSONDecodeError:
-        # If the file is corrupted, reset it
-        with open(SAVED_PLANS_FILE, 'w') as f:
-            json.dump({}, f, indent=4)
-        return []
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            if path == WHOLE_LIFE_JSONL:
+                f.writelines(json.dumps(plan, ensure_ascii=False) + "\n" for plan in plans)
+            else:
+                json.dump(plans, f, ensure_ascii=False, indent=4)
+        os.replace(temp_file, path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
 
-# Save a plan for a user
-def save_plan(plan_id, user_id="default"):
-    """Save a plan for a user."""
-    if not os.path.exists(SAVED_PLANS_FILE):
-        initialize_data_files()
-    
-    # Get the plan details
-    plan = get_plan_by_id(plan_id)
-    if not plan:
-        return False
+# Re-import the CSV, applying only the rows that were added, changed or removed
+@metrics.timed("catalog.reimport")
+def reimport_whole_life_from_csv():
+    """Incrementally re-import the CSV against the current catalog.
+
+    Plans are keyed on their content-hash id, so unchanged plans keep their
+    entries and saved plans keep resolving. Plans with legacy positional ids
+    are migrated to hash ids, and saved plans are remapped to match. The
+    catalog file is only rewritten when something changed; applying any diff
+    rewrites the whole file and rebuilds the store, an O(catalog) step.
+
+    Returns a summary dict of added, changed and removed plan ids, or None on error.
+    """
+    if not os.path.exists(WHOLE_LIFE_CSV):
+        print(f"Error: CSV file '{WHOLE_LIFE_CSV}' not found.")
+        return None
     
-    # Read current saved plans
+    started = time.perf_counter()
     try:
-        with open(SAVED_PLANS_FILE, 'r') as f:
-            saved_plans_data = json.load(f)
-    except json.JSONDecodeError:
-        # If the file is corrupted, reset it
-        saved_plans_data = {}
+        df = pd.read_csv(WHOLE_LIFE_CSV, delimiter=';', encoding='utf-8')
+        incoming = {plan["id"]: plan for plan in build_plans_from_frame(df)}
+    except Exception as e:
+        print(f"Error processing CSV file: {str(e)}")
+        return None
     
-    # Initialize user's saved plans if not exist
-    if user_id not in saved_plans_data:
-        saved_plans_data[user_id] = []
+    # Key the current catalog by content hash, noting ids that need migrating
+    current_plans = get_whole_life_insurance()
+    id_map = _catalog_legacy_id_map(current_plans)
+    previous = {id_map.get(plan.get("id"), plan.get("id")): plan for plan in current_plans}
     
-    # Check if plan is already saved
-    for saved_plan in saved_plans_data[user_id]:
-        if saved_plan['id'] == plan_id:
-            return True  # Already saved
+    added = [plan_id for plan_id in incoming if plan_id not in previous]
+    removed = [plan_id for plan_id in previous if plan_id not in incoming]
+    changed = [plan_id for plan_id in incoming
+               if plan_id in previous and not _same_plan_content(previous[plan_id], incoming[plan_id])]
+    summary = {
+        "added": added,
+        "changed": changed,
+        "removed": removed,
+        "unchanged": len(incoming) - len(added) - len(changed),
+        "remapped_ids": len(id_map)
+    }
     
-    # Add saved date to plan
-    saved_plan = plan.copy()
-    saved_plan['date_saved'] = datetime.now().strftime("%B %d, %Y")
+    if added or changed or removed or id_map:
+        # Keep unchanged entries in place, swap in changed ones and append new ones
+        changed_ids = set(changed)
+        merged = []
+        for plan_id, plan in previous.items():
+            if plan_id not in incoming:
+                continue
+            if plan_id in changed_ids:
+                merged.append(incoming[plan_id])
+            elif plan.get("id") != plan_id:
+                # Cached plans are shared, so migrate a copy
+                merged.append(dict(plan, id=plan_id))
+            else:
+                merged.append(plan)
+        merged.extend(incoming[plan_id] for plan_id in added)
+        
+        # Write the catalog first so saved plans are only remapped to ids it contains
+        try:
+            saved_id_map = _legacy_saved_plan_id_map(id_map)
+            ensure_data_dir()
+            _write_catalog_file(merged, _catalog_source() or WHOLE_LIFE_FILE)
+            if saved_id_map:
+                _remap_saved_plan_ids(saved_id_map)
+            
+            # Saved plans only reference the catalog, so keep a copy of removed plans
+            if removed:
+                get_storage().set_snapshots({plan_id: dict(previous[plan_id], id=plan_id) for plan_id in removed})
+        except Exception as e:
+            print(f"Error applying re-import: {str(e)}")
+            return None
+    
+    summary["seconds"] = time.perf_counter() - started
+    print(f"Re-imported catalog: {len(added)} added, {len(changed)} changed, {len(removed)} removed, "
+          f"{summary['unchanged']} unchanged in {summary['seconds']:.3f}s")
+    return summary
+
+# Record and report the throughput of a CSV import
+def _record_import_stats(rows, parse_seconds, write_seconds):
+    elapsed = parse_seconds + write_seconds
+    _last_import_stats.clear()
+    _last_import_stats.update({
+        "rows": rows,
+        "parse_seconds": parse_seconds,
+        "write_seconds": write_seconds,
+        "total_seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed > 0 else float("inf")
+    })
+    print(f"Imported {rows} rows in {elapsed:.3f}s ({_last_import_stats['rows_per_second']:.0f} rows/sec)")
+
+# Get timing of the most recent CSV import
+def get_last_import_stats():
+    """Return rows, timings and rows/sec of the most recent CSV import."""
+    return dict(_last_import_stats)
+
+# Stream plans from the JSON Lines catalog
+def iter_whole_life_insurance(path=WHOLE_LIFE_JSONL):
+    """Yield plans one at a time from a JSON Lines catalog.
+
+    Only one line is held in memory at a time. If the JSON Lines file does not
+    exist, plans are yielded from the cached JSON catalog instead.
+    """
+    if not os.path.exists(path):
+        yield from get_whole_life_insurance()
+        return
     
-    # Add to saved plans
-    saved_plans_data[user_id].append(saved_plan)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+# Pick the catalog file to serve: the newer of the JSON and JSON Lines catalogs
+def _catalog_source():
+    candidates = []
+    for path in (WHOLE_LIFE_FILE, WHOLE_LIFE_JSONL):
+        try:
+            candidates.append((os.stat(path).st_mtime_ns, path))
+        except OSError:
+            continue
+    return max(candidates)[1] if candidates else None
+
+# Get the (path, mtime, size) signature used to detect catalog file changes
+def _catalog_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+# Open the compiled snapshot if it was built from the current catalog source
+def _open_catalog_snapshot(source):
+    header = read_snapshot_header(WHOLE_LIFE_SNAPSHOT)
+    if header is None:
+        return None
     
-    # Write back to file
-    with open(SAVED_PLANS_FILE, 'w') as f:
-        json.dump(saved_plans_data, f, indent=4)
+    # Without a source file any valid snapshot is served; otherwise it must be current
+    if source is not None and header.get("source") != list(_catalog_signature(source)):
+        return None
     
-    return True
+    try:
+        store = PlanStore.from_snapshot(WHOLE_LIFE_SNAPSHOT)
+    except Exception as e:
+        print(f"Error opening catalog snapshot: {str(e)}")
+        return None
+    _catalog_stats["snapshot_loads"] += 1
+    return store
 
-# Remove a saved plan
-def remove_saved_plan(plan_id, user_id="default"):
-    """Remove a saved plan."""
-    if not os.path.exists(SAVED_PLANS_FILE):
+# Write the compiled snapshot next to the catalog file
+def _write_catalog_snapshot(write, source):
+    """Call ``write(path, source_signature)`` on a temporary file and move it into place.
+
+    Returns whether the snapshot was written.
+    """
+    temp_file = None
+    try:
+        temp_file = _temp_path_for(WHOLE_LIFE_SNAPSHOT)
+        write(temp_file, list(_catalog_signature(source)))
+        os.replace(temp_file, WHOLE_LIFE_SNAPSHOT)
+        _catalog_stats["snapshot_writes"] += 1
+        return True
+    except Exception as e:
+        # The snapshot is only an accelerator; keep serving from memory
+        print(f"Error writing catalog snapshot: {str(e)}")
+        if temp_file is not None and os.path.exists(temp_file):
+            os.remove(temp_file)
         return False
+
+# Read every plan of a catalog file
+def _read_catalog_plans(source):
+    if source == WHOLE_LIFE_JSONL:
+        return iter_whole_life_insurance(source)
+    with open(source, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# Load the catalog, preferring the snapshot and rebuilding it from the catalog file when stale
+@metrics.timed("catalog.load")
+def _load_catalog_store(source):
+    """Open the snapshot, or compile the catalog file into a new one and open that.
+
+    A JSON Lines catalog is compiled one plan at a time and then served
+    memory-mapped, so loading it never holds every plan dict at once; memory
+    grows only with the fixed-width columns and indexes. A JSON catalog has
+    to be parsed whole first. If no snapshot can be written the store is
+    built in memory.
+    """
+    store = _open_catalog_snapshot(source)
+    if store is not None or source is None:
+        return store
     
-    # Read current saved plans
     try:
-        with open(SAVED_PLANS_FILE, 'r') as f:
-            saved_plans_data = json.load(f)
-    except json.JSONDecodeError:
-        # If the file is corrupted, reset it
-        return False
+        compiled = _write_catalog_snapshot(
+            lambda path, signature: write_plans_snapshot(path, _read_catalog_plans(source), signature), source
+        )
+        if compiled:
+            store = _open_catalog_snapshot(source)
+            if store is not None:
+                return store
+        return PlanStore(_read_catalog_plans(source))
+    except Exception as e:
+        print(f"Error loading whole life insurance data: {str(e)}")
+        return None
+
+# Get the cached plan catalog, (re)loading it when the file has changed
+def _get_catalog():
+    """Return the cached PlanStore for the catalog, or None if it cannot be loaded."""
+    # Import if neither a catalog file nor a snapshot exists
+    source = _catalog_source()
+    if source is None and not os.path.exists(WHOLE_LIFE_SNAPSHOT):
+        import_whole_life_from_csv()
+        source = WHOLE_LIFE_FILE
     
-    # Check if user has any saved plans
-    if user_id not in saved_plans_data:
-        return False
+    signature = _catalog_signature(source if source is not None else WHOLE_LIFE_SNAPSHOT)
+    with _catalog_lock:
+        if _catalog_cache["store"] is not None and _catalog_cache["signature"] == signature:
+            _catalog_stats["hits"] += 1
+            return _catalog_cache["store"]
+        
+        store = _load_catalog_store(source)
+        if store is None:
+            return None
+        with metrics.timer("catalog.materialize_views"):
+            store.materialize_segment_views(SEGMENT_VIEW_GENDERS, SEGMENT_VIEW_AGES, SEGMENT_VIEW_SMOKER_STATUSES)
+        
+        # A reload means the file changed under an already populated cache
+        if _catalog_cache["store"] is None:
+            _catalog_stats["misses"] += 1
+        else:
+            _catalog_stats["reloads"] += 1
+        _catalog_cache["signature"] = signature
+        _catalog_cache["store"] = store
+        _catalog_cache["version"] += 1
+        return store
+
+# Get whole life insurance plans
+def get_whole_life_insurance():
+    """Retrieve all whole life insurance plans.
+
+    Plans are served from the process-wide cache and are shared between
+    callers, so treat the returned list and its plans as read-only.
+    """
+    store = _get_catalog()
+    if store is None:
+        # Return empty list as fallback
+        return []
+    return store.plans
+
+# Get the version of the loaded catalog
+def get_catalog_version():
+    """Return a number that changes whenever the catalog is (re)loaded.
+
+    Use it in cache keys for anything derived from plan data, such as
+    rendered plan cards.
+    """
+    _get_catalog()
+    with _catalog_lock:
+        return _catalog_cache["version"]
+
+# Get catalog cache counters
+def get_catalog_cache_stats():
+    """Return hit/miss/reload counters for the plan catalog cache."""
+    with _catalog_lock:
+        stats = dict(_catalog_stats)
+        stats["cached_plans"] = len(_catalog_cache["store"]) if _catalog_cache["store"] is not None else 0
+    return stats
+
+# Drop the cached catalog
+def clear_catalog_cache():
+    """Drop the cached catalog so the next access re-reads the file."""
+    with _catalog_lock:
+        _catalog_cache["signature"] = None
+        _catalog_cache["store"] = None
+
+# Slice one page out of a list of plan indices
+def _page(indices, offset=0, limit=None):
+    offset = max(0, offset or 0)
+    return indices[offset:] if limit is None else indices[offset:offset + max(0, limit)]
+
+# Filter whole life insurance plans by criteria
+@metrics.timed("catalog.filter")
+def filter_whole_life_insurance(gender=None, age=None, smoker_status=None, max_price=None, min_score=None,
+                                company=None, premium_term_years=None, max_waiting_period_days=None,
+                                min_payout_percent=None, max_payout_percent=None, offset=0, limit=None):
+    """Filter whole life insurance plans based on criteria.
+
+    Waiting period and payout ranges run on the numeric columns parsed at
+    import, e.g. ``max_waiting_period_days=90, min_payout_percent=1000``.
+    ``offset`` and ``limit`` return one page of the matches in catalog order.
+    """
+    store = _get_catalog()
+    if store is None:
+        return []
     
-    # Remove the plan from user's saved plans
-    saved_plans_data[user_id] = [plan for plan in saved_plans_data[user_id] if plan['id'] != plan_id]
+    # Predicates run as vectorized masks over the columnar store
+    indices = store.filter_indices(
+        gender=gender,
+        age=age,
+        smoker_status=smoker_status,
+        max_price=max_price,
+        min_score=min_score,
+        company=company,
+        premium_term_years=premium_term_years,
+        max_waiting_period_days=max_waiting_period_days,
+        min_payout_percent=min_payout_percent,
+        max_payout_percent=max_payout_percent
+    )
+    return store.take(_page(indices, offset, limit))
+
+# Score columns a recommendation can be ranked by
+RECOMMENDATION_SCORE_KEYS = ("whole_life_score", "total_score", "terms_score")
+
+# Criteria keys the chatbot extracts, with the type each value is coerced to
+RECOMMENDATION_CRITERIA = {
+    "gender": str,
+    "age": int,
+    "smoker_status": str,
+    "max_price": float,
+    "min_score": float
+}
+
+# Coerce LLM-extracted criteria to filter arguments, dropping unknown or malformed values
+def normalize_criteria(criteria):
+    normalized = {}
+    for key, cast in RECOMMENDATION_CRITERIA.items():
+        value = (criteria or {}).get(key)
+        if value in (None, ""):
+            continue
+        try:
+            normalized[key] = cast(float(value)) if cast is not str else str(value)
+        except (TypeError, ValueError):
+            print(f"Ignoring invalid {key} criterion: {value!r}")
+    return normalized
+
+# Recommend the top-k plans matching the chatbot's search criteria
+@metrics.timed("catalog.recommend")
+def recommend_plans(criteria, k=3, score_key="whole_life_score", distinct=True):
+    """Return the ``k`` best plans matching ``criteria``, ranked by ``score_key``.
+
+    ``criteria`` is the chatbot's insurance_criteria dict (gender, age,
+    smoker_status, max_price, min_score). Matching runs through the filter
+    path and only the top candidates are selected, so the catalog is never
+    sorted. With an age, only quotes from the applicant's price bracket are
+    considered, so plans are ranked and priced at what the applicant would
+    pay. With ``distinct`` a plan offered with several premium terms is
+    recommended once.
+    """
+    if score_key not in RECOMMENDATION_SCORE_KEYS:
+        raise ValueError(f"Unknown score key: {score_key}")
+
+    store = _get_catalog()
+    if store is None:
+        return []
+
+    criteria = normalize_criteria(criteria)
+    mask = store.filter_mask(**criteria)
+    age = criteria.get("age")
+    if age:
+        # The filter keeps every younger quote; restrict it to the applicant's segment
+        if criteria.get("gender") and criteria.get("smoker_status"):
+            segment = store.find_segment(criteria["gender"], age, criteria["smoker_status"])
+            mask &= store.segment == (segment if segment is not None else -1)
+        else:
+            bracket = store.bracket_age(age)
+            mask &= store.age == (bracket if bracket is not None else -1)
+    indices = np.flatnonzero(mask)
+    if not distinct:
+        return store.take(store.top_k(indices, score_key, k))
+
+    # Widen the partial selection until it holds k distinct (company, title) pairs
+    limit = k * 4
+    while True:
+        picks, seen = [], set()
+        for plan in store.take(store.top_k(indices, score_key, limit)):
+            key = (plan["company"], plan["title"])
+            if key not in seen:
+                seen.add(key)
+                picks.append(plan)
+        if len(picks) >= k or limit >= len(indices):
+            return picks[:k]
+        limit *= 2
+
+# Get the best-value plans for a customer segment
+def get_pareto_frontier(gender, age, smoker_status, score_key="total_score"):
+    """Return the segment's Pareto-optimal plans on price vs score, cheapest first.
+
+    Every other plan in the segment costs at least as much as one of these
+    and scores no better. Frontiers are precomputed at catalog load.
+    """
+    if score_key not in PARETO_SCORE_COLUMNS:
+        raise ValueError(f"Unknown score key: {score_key}")
+
+    store = _get_catalog()
+    if store is None:
+        return []
+    return store.take(store.frontier_indices(gender, age, smoker_status, score_key))
+
+# Get the ids of every plan on its segment's price-vs-score frontier
+def get_value_pick_ids(score_key="total_score"):
+    """Return a frozenset of plan ids not dominated within their segment."""
+    store = _get_catalog()
+    if store is None:
+        return frozenset()
+    return store.value_pick_ids.get(score_key, frozenset())
+
+# Check whether a cheaper, better-scoring plan exists in the same segment
+def is_plan_dominated(plan_id, score_key="total_score"):
+    """Return True if the plan is dominated on price vs score, False otherwise."""
+    store = _get_catalog()
+    if store is None or plan_id not in store.id_index:
+        return False
+    return store.is_dominated(store.id_index[plan_id], score_key)
+
+# Get the de-duplicated, score-ordered plans for a customer segment
+@metrics.timed("catalog.segment_plans")
+def get_segment_plans(gender, age, smoker_status, max_price=None, min_score=None, offset=0, limit=None):
+    """Return one plan per (company, title) for the segment, best whole-life score first.
+
+    Views for the segments the plans screen offers are materialized when the
+    catalog loads, so a lookup is a dictionary hit unless the price or score
+    limit excludes some of the segment's plans. ``offset`` and ``limit`` page
+    through the ranked list; only the returned page is decoded.
+    """
+    store = _get_catalog()
+    if store is None:
+        return []
+    indices = store.segment_view(gender, age, smoker_status, max_price=max_price, min_score=min_score)
+    return store.take(_page(indices, offset, limit))
+
+# Get per-field counts for the current filter selection
+def get_facet_counts(gender=None, age=None, smoker_status=None, max_price=None, min_score=None,
+                     company=None, premium_term_years=None):
+    """Return {field: {value: plan count}} for gender, smoker status, company and premium term.
+
+    Each field's counts apply every other criterion, e.g. the gender counts
+    for a smoker selection say how many smoker plans each gender has.
+    """
+    store = _get_catalog()
+    if store is None:
+        return {}
+    return store.facet_counts(gender=gender, age=age, smoker_status=smoker_status, max_price=max_price,
+                              min_score=min_score, company=company, premium_term_years=premium_term_years)
+
+# Get the cumulative price and score histograms for a customer segment
+def get_segment_histograms(gender, age, smoker_status):
+    """Return sorted per-plan price and total score thresholds for a segment.
+
+    ``price_thresholds`` is each listed plan's cheapest premium term and
+    ``score_thresholds`` its best total score; both are precomputed with the
+    segment views, and a binary search on them counts the plans a price or
+    score limit keeps. ``max_price`` is the dearest premium in the segment.
+    Returns None for a segment that is not materialized.
+    """
+    store = _get_catalog()
+    if store is None:
+        return None
+    view = store.segment_views.get((gender, age, smoker_status))
+    if view is None:
+        return None
+    return {
+        "price_thresholds": view["price_thresholds"],
+        "score_thresholds": view["score_thresholds"],
+        "max_price": view["max_price"]
+    }
+
+# Count the segment's plans under a price limit or above a score limit
+def count_segment_plans(gender, age, smoker_status, max_price=None, min_score=None):
+    """Return how many plans the plans screen lists for the segment and limits.
+
+    A single price or score limit is answered in O(log n) from the segment
+    histograms; with both limits the segment view is ranked and counted
+    without decoding any plans.
+    """
+    histograms = get_segment_histograms(gender, age, smoker_status)
+    if histograms is None or (max_price and min_score):
+        store = _get_catalog()
+        if store is None:
+            return 0
+        return len(store.segment_view(gender, age, smoker_status, max_price=max_price, min_score=min_score))
+
+    prices, scores = histograms["price_thresholds"], histograms["score_thresholds"]
+    if max_price:
+        return int(np.searchsorted(prices, max_price, side="right"))
+    if min_score:
+        return len(scores) - int(np.searchsorted(scores, min_score, side="left"))
+    return len(prices)
+
+# Get the distinct insurer names in the catalog
+def get_companies():
+    """Return the catalog's company strings, sorted."""
+    store = _get_catalog()
+    if store is None:
+        return []
+    return sorted(company for company in store.company_vocabulary if company is not None)
+
+# Get per-value plan counts for the categorical filters
+def get_filter_cardinalities():
+    """Return {field: {value: plan count}} for the bitmap-indexed filter fields."""
+    store = _get_catalog()
+    if store is None:
+        return {}
+    return {field: dict(counts) for field, counts in store.bitmap_index.cardinalities.items()}
+
+# Get plan by ID
+def get_plan_by_id(plan_id):
+    """Get a specific plan by ID."""
+    store = _get_catalog()
+    if store is None:
+        return None
+    return store.get(plan_id)
+
+# Get several plans by ID
+def get_plans_by_ids(plan_ids):
+    """Get plans for a list of IDs in one pass.
+
+    Returns a list aligned with ``plan_ids``; IDs that are not in the catalog
+    map to None.
+    """
+    store = _get_catalog()
+    if store is None:
+        return [None] * len(plan_ids)
+    return store.get_many(plan_ids)
+
+# Create a storage backend by name
+def _create_storage(backend):
+    if backend == "json":
+        return JsonStorage(SAVED_PLANS_FILE, USER_PROFILES_FILE)
+    if backend == "sqlite":
+        ensure_data_dir()
+        return SqliteStorage(USER_DB_FILE)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+# Get the storage backend for saved plans and user profiles
+def get_storage():
+    """Return the active user data backend, creating it on first use.
+
+    Writes go through a write-behind buffer that coalesces bursts of changes
+    into a single durable write; see flush_user_data().
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = WriteBehindStorage(_create_storage(STORAGE_BACKEND), USER_DATA_FLUSH_DELAY)
+        return _storage
+
+# Switch the storage backend
+def set_storage_backend(backend):
+    """Use the "json" or "sqlite" backend for saved plans and user profiles."""
+    global _storage, STORAGE_BACKEND
+    storage = WriteBehindStorage(_create_storage(backend), USER_DATA_FLUSH_DELAY)
+    with _storage_lock:
+        previous, _storage = _storage, storage
+        STORAGE_BACKEND = backend
+    if previous is not None:
+        previous.flush()
+
+# Write buffered user data changes now
+def flush_user_data():
+    """Flush buffered saved plan and profile changes to the storage backend."""
+    get_storage().flush()
+
+# Migrate the JSON user data files into SQLite
+def migrate_user_data_to_sqlite():
+    """Copy saved plans and profiles from the JSON files into the SQLite database.
+
+    Returns the number of copied saved plans and profiles. Switch to the new
+    backend afterwards with set_storage_backend("sqlite") or INSUREBOT_STORAGE=sqlite.
+    """
+    flush_user_data()
+    counts = migrate_storage(_create_storage("json"), _create_storage("sqlite"))
+    print(f"Migrated {counts['saved_plans']} saved plans and {counts['user_profiles']} profiles to {USER_DB_FILE}")
+    return counts
+
+# Get a user's saved plans
+@metrics.timed("user_data.get_saved_plans")
+def get_saved_plans(user_id="default"):
+    """Get a user's saved plans.
+
+    The store only keeps plan id references, so the plans are joined against
+    the cached catalog in one batch lookup. Plans that have been removed from
+    the catalog are served from the snapshot taken when they were removed.
+    """
+    # Load the catalog first: importing a missing one remaps legacy saved plan ids
+    _get_catalog()
+    entries = get_storage().get_saved_plans(user_id)
+    catalog_plans = get_plans_by_ids([entry['id'] for entry in entries])
     
-    # Write back to file
-    with open(SAVED_PLANS_FILE, 'w') as f:
-        json.dump(saved_plans_data, f, indent=4)
+    saved_plans = []
+    stale_snapshots = {}
+    for entry, plan in zip(entries, catalog_plans):
+        if plan is None:
+            plan = entry['snapshot']
+            if plan is None:
+                continue
+        elif entry['snapshot'] is not None and not LEGACY_PLAN_ID_PATTERN.match(entry['id']):
+            # The plan is back in (or never left) the catalog; drop the copy. Entries
+            # under positional ids keep it until an import remaps them to hash ids.
+            stale_snapshots[entry['id']] = None
+        
+        saved_plan = plan.copy()
+        saved_plan['id'] = entry['id']
+        saved_plan['date_saved'] = entry['date_saved']
+        saved_plans.append(saved_plan)
     
-    return True
+    if stale_snapshots:
+        get_storage().set_snapshots(stale_snapshots)
+    return saved_plans
+
+# Save a plan for a user
+def save_plan(plan_id, user_id="default"):
+    """Save a plan for a user."""
+    return bool(save_plans([plan_id], user_id))
+
+# Save several plans for a user
+@metrics.timed("user_data.save_plans")
+def save_plans(plan_ids, user_id="default"):
+    """Save several plans for a user in one batch.
+
+    Returns the ids that were saved; ids that are not in the catalog are skipped.
+    """
+    # Only plans in the catalog can be saved
+    found_ids = [plan_id for plan_id, plan in zip(plan_ids, get_plans_by_ids(plan_ids)) if plan is not None]
+    if found_ids:
+        # Already saved plans are left untouched
+        get_storage().add_saved_plans(user_id, found_ids, datetime.now().strftime("%B %d, %Y"))
+    return found_ids
+
+# Rewrite saved plan ids after a catalog id migration
+def _remap_saved_plan_ids(id_map):
+    get_storage().remap_saved_plan_ids(id_map)
+
+# Remove a saved plan
+def remove_saved_plan(plan_id, user_id="default"):
+    """Remove a saved plan."""
+    return remove_saved_plans([plan_id], user_id)
+
+# Remove several saved plans
+@metrics.timed("user_data.remove_saved_plans")
+def remove_saved_plans(plan_ids, user_id="default"):
+    """Remove several saved plans in one batch."""
+    return get_storage().remove_saved_plans(user_id, plan_ids)
 
 # Custom JSON serializer for handling datetime objects
 def json_serializable(obj):
@@ -302,11 +1089,9 @@ def json_serializable(obj):
     raise TypeError(f"Type {type(obj)} not serializable")
 
 # Save user profile data
+@metrics.timed("user_data.save_profile")
 def save_user_profile(profile_data, user_id="default"):
     """Save user profile data."""
-    if not os.path.exists(USER_PROFILES_FILE):
-        initialize_data_files()
-    
     # Create a serializable copy of the profile data
     serializable_profile = {}
     for key, value in profile_data.items():
@@ -316,41 +1101,13 @@ def save_user_profile(profile_data, user_id="default"):
         else:
             serializable_profile[key] = value
     
-    # Read current profiles
-    try:
-        with open(USER_PROFILES_FILE, 'r') as f:
-            profiles = json.load(f)
-    except (json.JSONDecodeError, UnicodeDecodeError):
-        # If the file is corrupted or empty, reset it
-        profiles = {}
-    
-    # Update profile
-    profiles[user_id] = serializable_profile
-    
-    # Write back to file
-    with open(USER_PROFILES_FILE, 'w') as f:
-        json.dump(profiles, f, indent=4)
-    
+    get_storage().save_user_profile(user_id, serializable_profile)
     return True
 
 # Get user profile data
 def get_user_profile(user_id="default"):
     """Get user profile data."""
-    if not os.path.exists(USER_PROFILES_FILE):
-        initialize_data_files()
-    
-    # Read profiles
-    try:
-        with open(USER_PROFILES_FILE, 'r') as f:
-            profiles = json.load(f)
-        
-        # Return the profile or empty dict if not found
-        return profiles.get(user_id, {})
-    except json.JSONDecodeError:
-        # If the file is corrupted, reset it
-        with open(USER_PROFILES_FILE, 'w') as f:
-            json.dump({}, f, indent=4)
-        return {}
+    return get_storage().get_user_profile(user_id)
 
 # Initialize data files when module is imported
 initialize_data_files() 
\ No newline at end of file
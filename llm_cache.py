@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+from bounded_cache import BoundedLRU
+
+# On-disk tier shared by every process serving the app; an empty path keeps the cache in memory only
+LLM_CACHE_FILE = os.environ.get("INSUREBOT_LLM_CACHE_FILE", os.path.join("data", "llm_cache.db"))
+
+# Seconds a cached response stays valid; 0 turns the cache off
+LLM_CACHE_TTL = float(os.environ.get("INSUREBOT_LLM_CACHE_TTL", str(24 * 3600)))
+
+# Maximum number of responses kept in memory and on disk
+LLM_CACHE_SIZE = 512
+LLM_CACHE_DISK_ENTRIES = 20000
+
+# Responses longer than this are not cached
+LLM_CACHE_MAX_RESPONSE_CHARS = 20000
+
+# Cache key -> (expires_at, response)
+_response_cache = BoundedLRU(LLM_CACHE_SIZE)
+_cache_lock = threading.Lock()
+_cache_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "stores": 0}
+_local = threading.local()
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_responses (
+        key TEXT PRIMARY KEY,
+        response TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses (last_used);
+"""
+
+# Normalize a prompt so trivially different spellings of a question share an entry
+def normalize_prompt(prompt):
+    """Case-fold the prompt and collapse all runs of whitespace to single spaces."""
+    return " ".join(prompt.casefold().split())
+
+# Build the cache key for a prompt sent with a given template, model and system prompt
+def cache_key(prompt, template_version, model, system_prompt=None):
+    payload = json.dumps([normalize_prompt(prompt), template_version, model, system_prompt])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Whether caching is enabled
+def cache_enabled():
+    return LLM_CACHE_TTL > 0
+
+# Get this thread's connection to the disk tier, opening it on first use
+def _connection():
+    if not LLM_CACHE_FILE:
+        return None
+    connection = getattr(_local, "connection", None)
+    if connection is None or getattr(_local, "path", None) != LLM_CACHE_FILE:
+        directory = os.path.dirname(LLM_CACHE_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(LLM_CACHE_FILE, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+        _local.connection = connection
+        _local.path = LLM_CACHE_FILE
+    return connection
+
+# Count a cache event in the local stats and the shared metrics
+def _count(event):
+    with _cache_lock:
+        _cache_stats[event] += 1
+    metrics.increment(f"llm_cache.{event}")
+
+# Look up a cached response
+def get_cached_response(key):
+    """Return the cached response for ``key``, or None if it is missing or expired."""
+    if not cache_enabled():
+        return None
+    now = time.time()
+    entry = _response_cache.get(key)
+    if entry is not None:
+        if entry[0] > now:
+            _count("memory_hits")
+            return entry[1]
+        # Count the expiry here; the disk copy expires at the same time and is dropped quietly
+        _response_cache.pop(key)
+        _count("expired")
+
+    try:
+        connection = _connection()
+        row = None
+        if connection is not None:
+            row = connection.execute("SELECT response, expires_at FROM llm_responses WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is not None and row[1] > now:
+                with connection:
+                    connection.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key))
+            elif row is not None:
+                with connection:
+                    connection.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                if entry is None:
+                    _count("expired")
+                row = None
+    except sqlite3.Error as e:
+        print(f"Error reading LLM cache: {str(e)}")
+        row = None
+
+    if row is None:
+        _count("misses")
+        return None
+    _response_cache.put(key, (row[1], row[0]))
+    _count("disk_hits")
+    return row[0]
+
+# Store a model response in both tiers
+def store_response(key, response):
+    """Cache ``response`` under ``key`` for LLM_CACHE_TTL seconds; only pass real model output."""
+    if not cache_enabled() or not response or len(response) > LLM_CACHE_MAX_RESPONSE_CHARS:
+        return False
+    now = time.time()
+    expires_at = now + LLM_CACHE_TTL
+    _response_cache.put(key, (expires_at, response))
+    _count("stores")
+
+    try:
+        connection = _connection()
+        if connection is not None:
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO llm_responses (key, response, expires_at, last_used) "
+                                   "VALUES (?, ?, ?, ?)", (key, response, expires_at, now))
+                # Drop expired rows, then the least recently used ones above the cap
+                connection.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+                connection.execute("DELETE FROM llm_responses WHERE key IN (SELECT key FROM llm_responses "
+                                   "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (LLM_CACHE_DISK_ENTRIES,))
+    except sqlite3.Error as e:
+        print(f"Error writing LLM cache: {str(e)}")
+    return True
+
+# Get response cache counters
+def get_llm_cache_stats():
+    """Return hit/miss counters, the hit rate and the number of responses in memory."""
+    with _cache_lock:
+        stats = dict(_cache_stats)
+    stats["cached_responses"] = len(_response_cache)
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+    return stats
+
+# Drop every cached response from memory and, optionally, from disk
+def clear_llm_cache(disk=True):
+    _response_cache.clear()
+    if disk:
+        connection = _connection()
+        if connection is not None:
+            with connection:
+                connection.execute("DELETE FROM llm_responses")
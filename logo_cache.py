@@ -0,0 +1,110 @@
+import io
+import os
+import threading
+
+from PIL import Image
+
+from bounded_cache import BoundedLRU
+
+# Logo directory, resolved relative to this file
+LOGO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo")
+
+# Logo file for each insurer, keyed by the English company name
+COMPANY_LOGO_FILES = {
+    "AIA": "Brokerage_AIA_e76423525d.png",
+    "AXA": "AXA_logo_21b519b8f2.png",
+    "BOC Life": "BOCL_logo_c3917e8087.png",
+    "Chubb": "Chubb_logo_bbd61d9801.png",
+    "China Life": "China_Life_logo_6849c94581.png",
+    "FT Life": "FT_Life_logo_954f536d7e.jpg",
+    "CTF Life": "FT_Life_logo_954f536d7e.jpg",
+    "FWD": "FWD_logo_694230ea93.jpg",
+    "Generali": "Generali_logo_78dd1d3d8b.png",
+    "Manulife": "Manulife_logo_1449597a78.png",
+    "Prudential": "Prudential_logo_f4e56bc4f0.png",
+    "Sun Life": "Insurer_Sun_Life_logo_new2023_b0ccadbe5f.png",
+    "Well Link": "Well_Link_logo_2_resized_96d44077d2.png",
+    "YF Life": "YF_Life_logo_065ba084ce.png"
+}
+
+# Thumbnails are stored no wider than they are displayed: st.image decodes and resizes any
+# image wider than its ``width``, so a wider thumbnail would be resized again on every render
+LOGO_DISPLAY_WIDTH = 150
+LOGO_THUMBNAIL_SIZE = (LOGO_DISPLAY_WIDTH, LOGO_DISPLAY_WIDTH)
+
+# Maximum number of thumbnails kept in memory
+LOGO_CACHE_SIZE = 64
+
+# Catalog company string -> logo filename ("" when the insurer has no logo)
+_company_table = {}
+
+# Company string -> PNG-encoded thumbnail
+_thumbnail_cache = BoundedLRU(LOGO_CACHE_SIZE)
+_logo_lock = threading.Lock()
+
+# Match a catalog company string such as "FWD | 富衛" to its logo filename
+def resolve_logo_filename(company_name):
+    """Return the logo filename for ``company_name``, or "" if there is none."""
+    if company_name in COMPANY_LOGO_FILES:
+        return COMPANY_LOGO_FILES[company_name]
+
+    # Try the English part before any pipe symbol, then a substring match
+    english_name = company_name.split("|")[0].strip()
+    if english_name in COMPANY_LOGO_FILES:
+        return COMPANY_LOGO_FILES[english_name]
+    for key, filename in COMPANY_LOGO_FILES.items():
+        if key in company_name:
+            return filename
+    return ""
+
+# Build the canonical company -> logo table for the catalog's companies
+def build_company_table(companies):
+    """Resolve every company string once and keep the result."""
+    table = {company: resolve_logo_filename(company) for company in companies}
+    with _logo_lock:
+        _company_table.update(table)
+    return table
+
+# Get the logo filename for a company, resolving and remembering unseen names
+def get_logo_filename(company_name):
+    with _logo_lock:
+        filename = _company_table.get(company_name)
+    if filename is None:
+        filename = build_company_table([company_name])[company_name]
+    return filename
+
+# Decode a logo file and shrink it to a PNG thumbnail
+def _load_thumbnail(filename):
+    try:
+        with Image.open(os.path.join(LOGO_DIR, filename)) as image:
+            image.thumbnail(LOGO_THUMBNAIL_SIZE)
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            return buffer.getvalue()
+    except Exception as e:
+        print(f"Error loading logo {filename}: {str(e)}")
+        return None
+
+# Get a company's logo thumbnail from the shared cache
+def get_logo_thumbnail(company_name):
+    """Return the PNG bytes of ``company_name``'s logo thumbnail, or None if it has no logo."""
+    def build():
+        filename = get_logo_filename(company_name)
+        return _load_thumbnail(filename) if filename else None
+
+    return _thumbnail_cache.get_or_build(company_name, build)
+
+# Resolve and decode the logos of every catalog company ahead of the first render
+def warm_logo_cache(companies):
+    """Fill the company table and thumbnail cache; returns the number of logos loaded."""
+    build_company_table(companies)
+    return sum(1 for company in companies if get_logo_thumbnail(company) is not None)
+
+# Get logo cache counters
+def get_logo_cache_stats():
+    """Return thumbnail cache hit/miss counters and sizes."""
+    stats = _thumbnail_cache.stats()
+    with _logo_lock:
+        companies = len(_company_table)
+    return {"hits": stats["hits"], "misses": stats["misses"], "cached_thumbnails": stats["size"],
+            "companies": companies}
@@ -0,0 +1,201 @@
+import atexit
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets; the last one catches everything
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+# Periodic export target; a ".prom" path is written as Prometheus text, anything else as JSON
+METRICS_FILE = os.environ.get("INSUREBOT_METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("INSUREBOT_METRICS_INTERVAL", "15"))
+
+_metrics_lock = threading.Lock()
+_operations = {}
+_counters = {}
+_exporter = {"thread": None, "stop": None, "path": None}
+
+# Create an empty latency record for an operation
+def _new_operation():
+    return {"count": 0, "errors": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(LATENCY_BUCKETS)}
+
+# Record one timed call of an operation
+def observe(name, seconds, error=False):
+    """Add a latency sample (in seconds) to the histogram for ``name``."""
+    with _metrics_lock:
+        operation = _operations.get(name)
+        if operation is None:
+            operation = _operations[name] = _new_operation()
+        operation["count"] += 1
+        operation["errors"] += 1 if error else 0
+        operation["sum"] += seconds
+        operation["max"] = max(operation["max"], seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                operation["buckets"][i] += 1
+                break
+
+# Increase a named counter
+def increment(name, value=1):
+    with _metrics_lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+# Time the enclosed block as one call of ``name``
+@contextmanager
+def timer(name):
+    """Context manager recording the block's latency; exceptions count as errors.
+
+    Streamlit's rerun/stop signals are BaseExceptions rather than errors, so
+    they are timed but not counted as failures.
+    """
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        observe(name, time.perf_counter() - start, error)
+
+# Decorator timing every call of a function as ``name``
+def timed(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Estimate a quantile from histogram buckets, interpolating inside the bucket
+def _bucket_quantile(operation, quantile):
+    count = operation["count"]
+    if count == 0:
+        return 0.0
+    rank = quantile * count
+    seen = 0
+    lower = 0.0
+    for bound, in_bucket in zip(LATENCY_BUCKETS, operation["buckets"]):
+        if in_bucket and seen + in_bucket >= rank:
+            upper = operation["max"] if math.isinf(bound) else min(bound, operation["max"])
+            return lower + (upper - lower) * (rank - seen) / in_bucket
+        seen += in_bucket
+        lower = bound
+    return operation["max"]
+
+# Get every operation's latency summary and all counters
+def get_metrics_snapshot():
+    """Return {"operations": {name: summary}, "counters": {name: value}, "generated_at": epoch}.
+
+    Each summary has count, errors, mean/p50/p95/max in milliseconds and the
+    cumulative bucket counts.
+    """
+    with _metrics_lock:
+        operations = {name: dict(op, buckets=list(op["buckets"])) for name, op in _operations.items()}
+        counters = dict(_counters)
+
+    summaries = {}
+    for name, op in sorted(operations.items()):
+        cumulative = []
+        total = 0
+        for bound, in_bucket in zip(LATENCY_BUCKETS, op["buckets"]):
+            total += in_bucket
+            cumulative.append(["+Inf" if math.isinf(bound) else bound, total])
+        summaries[name] = {
+            "count": op["count"],
+            "errors": op["errors"],
+            "mean_ms": round(op["sum"] / op["count"] * 1000, 3) if op["count"] else 0.0,
+            "p50_ms": round(_bucket_quantile(op, 0.5) * 1000, 3),
+            "p95_ms": round(_bucket_quantile(op, 0.95) * 1000, 3),
+            "max_ms": round(op["max"] * 1000, 3),
+            "sum_seconds": op["sum"],
+            "buckets": cumulative
+        }
+    return {"operations": summaries, "counters": dict(sorted(counters.items())), "generated_at": time.time()}
+
+# Escape an operation name for use as a Prometheus label value
+def _label(name):
+    return name.replace("\\", "\\\\").replace('"', '\\"')
+
+# Render the metrics in the Prometheus text exposition format
+def to_prometheus_text(snapshot=None):
+    snapshot = snapshot or get_metrics_snapshot()
+    lines = [
+        "# HELP insurebot_operation_seconds Latency of instrumented operations.",
+        "# TYPE insurebot_operation_seconds histogram"
+    ]
+    for name, summary in snapshot["operations"].items():
+        for bound, total in summary["buckets"]:
+            lines.append(f'insurebot_operation_seconds_bucket{{operation="{_label(name)}",le="{bound}"}} {total}')
+        lines.append(f'insurebot_operation_seconds_sum{{operation="{_label(name)}"}} {summary["sum_seconds"]}')
+        lines.append(f'insurebot_operation_seconds_count{{operation="{_label(name)}"}} {summary["count"]}')
+    lines.append("# HELP insurebot_operation_errors_total Instrumented operations that raised.")
+    lines.append("# TYPE insurebot_operation_errors_total counter")
+    for name, summary in snapshot["operations"].items():
+        lines.append(f'insurebot_operation_errors_total{{operation="{_label(name)}"}} {summary["errors"]}')
+    lines.append("# HELP insurebot_events_total Named event counters.")
+    lines.append("# TYPE insurebot_events_total counter")
+    for name, value in snapshot["counters"].items():
+        lines.append(f'insurebot_events_total{{event="{_label(name)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+# Write the current metrics to a file, atomically
+def write_metrics_file(path):
+    """Write a JSON snapshot, or Prometheus text if ``path`` ends in ".prom"."""
+    snapshot = get_metrics_snapshot()
+    payload = to_prometheus_text(snapshot) if path.endswith(".prom") else json.dumps(snapshot, indent=2)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+# Start a background thread writing the metrics file every ``interval`` seconds
+def start_metrics_exporter(path=None, interval=None):
+    """Start the periodic exporter once per process; no-op without a metrics file."""
+    path = path or METRICS_FILE
+    interval = interval or METRICS_INTERVAL
+    if not path:
+        return False
+
+    with _metrics_lock:
+        if _exporter["thread"] is not None:
+            return True
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    write_metrics_file(path)
+                except Exception as e:
+                    print(f"Error writing metrics file: {str(e)}")
+
+        thread = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+        _exporter.update(thread=thread, stop=stop, path=path)
+    thread.start()
+    atexit.register(stop_metrics_exporter)
+    return True
+
+# Stop the periodic exporter, writing one final snapshot
+def stop_metrics_exporter():
+    with _metrics_lock:
+        thread, stop, path = _exporter["thread"], _exporter["stop"], _exporter["path"]
+        _exporter.update(thread=None, stop=None, path=None)
+    if thread is None:
+        return
+    stop.set()
+    thread.join()
+    write_metrics_file(path)
+
+# Drop every recorded sample and counter
+def reset_metrics():
+    with _metrics_lock:
+        _operations.clear()
+        _counters.clear()
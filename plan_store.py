@@ -0,0 +1,775 @@
+import json
+import mmap
+import re
+import shutil
+import struct
+import tempfile
+from array import array
+
+import numpy as np
+
+# Sentinel code for values missing from a categorical column
+MISSING_CODE = -1
+
+# Columns held by every PlanStore, in snapshot order
+CATEGORICAL_COLUMNS = ("gender", "smoker_status", "company", "premium_term_years")
+# Columns stored as integer codes but not bitmap-indexed (too many distinct values)
+ENCODED_COLUMNS = CATEGORICAL_COLUMNS + ("title",)
+
+# Score columns with a precomputed price-vs-score Pareto frontier
+PARETO_SCORE_COLUMNS = ("total_score", "whole_life_score")
+
+NUMERIC_COLUMNS = (
+    "age", "price", "total_score", "whole_life_score", "terms_score",
+    "maximum_payout_percent", "waiting_period_days", "issue_age_min", "issue_age_max"
+)
+# Numeric columns stored as int64 with -1 for unknown values; the others are float64 with NaN
+INTEGER_COLUMNS = ("age", "issue_age_min", "issue_age_max")
+
+# Binary snapshot layout: magic, header length, JSON header, then 8-byte aligned sections
+SNAPSHOT_MAGIC = b"WLSNAP01"
+SNAPSHOT_VERSION = 3
+_SNAPSHOT_PREAMBLE = struct.Struct("<8sQ")
+
+# Patterns for the free-text 10Life columns ("1374.0%", "90 Days", "Age 0 to Age 50")
+PAYOUT_PERCENT_PATTERN = r'(\d+(?:\.\d+)?)\s*%'
+WAITING_DAYS_PATTERN = r'(\d+)\s*Days?'
+ISSUE_AGE_PATTERN = r'Age\s*(\d+)\s*to\s*Age\s*(\d+)'
+
+# Parse a maximum payout such as "1374.0%" to a percentage, or None
+def parse_payout_percent(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(PAYOUT_PERCENT_PATTERN, str(value))
+    return float(match.group(1)) if match else None
+
+# Parse a waiting period such as "90 Days" to a number of days, or None
+def parse_waiting_days(value):
+    if isinstance(value, int):
+        return value
+    match = re.search(WAITING_DAYS_PATTERN, str(value), re.IGNORECASE)
+    return int(match.group(1)) if match else None
+
+# Parse an issue age range such as "Age 0 to Age 50" to (min, max), or (None, None)
+def parse_issue_age_range(value):
+    match = re.search(ISSUE_AGE_PATTERN, str(value), re.IGNORECASE)
+    return (int(match.group(1)), int(match.group(2))) if match else (None, None)
+
+# Read a typed field, falling back to parsing the raw string for older catalogs
+def _typed_field(details, field, raw_field, parse):
+    if field in details:
+        return details[field]
+    return parse(details.get(raw_field))
+
+# Encode a list of categorical values as integer codes plus a value -> code vocabulary
+def encode_categorical(values):
+    vocabulary = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        if value is None:
+            codes[i] = MISSING_CODE
+            continue
+        code = vocabulary.get(value)
+        if code is None:
+            code = len(vocabulary)
+            vocabulary[value] = code
+        codes[i] = code
+    return codes, vocabulary
+
+# Parse one value to an integer, using a fallback if it is unparseable
+def parse_int(value, fallback=-1):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return fallback
+
+# Parse one value to a float, using NaN if it is unparseable
+def parse_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+# Parse a column of values to integers, using a fallback for unparseable entries
+def parse_int_column(values, fallback=-1):
+    return np.fromiter((parse_int(value, fallback) for value in values), dtype=np.int64, count=len(values))
+
+# Parse a column of values to floats, using NaN for unparseable entries
+def parse_float_column(values):
+    return np.fromiter((parse_float(value) for value in values), dtype=np.float64, count=len(values))
+
+# Get the raw value of every PlanStore column for one plan dict
+def plan_column_values(plan):
+    """Return {column: raw value} for the ENCODED_COLUMNS and NUMERIC_COLUMNS of ``plan``."""
+    details = plan.get("details", {})
+    if "issue_age_min" in details:
+        issue_age_min, issue_age_max = details["issue_age_min"], details.get("issue_age_max")
+    else:
+        issue_age_min, issue_age_max = parse_issue_age_range(details.get("issue_age"))
+    return {
+        "gender": details.get("gender"),
+        "smoker_status": details.get("smoker_status"),
+        "company": plan.get("company"),
+        "premium_term_years": details.get("premium_term_years"),
+        "title": plan.get("title"),
+        "age": details.get("age"),
+        "price": plan.get("price"),
+        "total_score": details.get("total_score"),
+        "whole_life_score": details.get("whole_life_score"),
+        "terms_score": details.get("terms_score"),
+        "maximum_payout_percent": _typed_field(details, "maximum_payout_percent", "maximum_payout",
+                                               parse_payout_percent),
+        "waiting_period_days": _typed_field(details, "waiting_period_days", "waiting_period", parse_waiting_days),
+        "issue_age_min": issue_age_min,
+        "issue_age_max": issue_age_max
+    }
+
+
+class BitmapIndex:
+    """Packed bitsets for low-cardinality categorical columns.
+
+    Each (field, value) pair maps to a bitset with one bit per plan, so a
+    multi-predicate lookup is a bitwise AND of precomputed bitsets. Predicates
+    are applied from the most to the least selective and the lookup stops as
+    soon as the running intersection is empty.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.bitsets = {}
+        self.cardinalities = {}
+
+    def add_column(self, field, codes, vocabulary):
+        """Index a column of integer codes under ``field``."""
+        self.bitsets[field] = {}
+        self.cardinalities[field] = {}
+        for value, code in vocabulary.items():
+            matches = codes == code
+            self.bitsets[field][value] = np.packbits(matches)
+            self.cardinalities[field][value] = int(np.count_nonzero(matches))
+
+    def cardinality(self, field, value):
+        """Return the number of plans whose ``field`` equals ``value``."""
+        return self.cardinalities.get(field, {}).get(value, 0)
+
+    def ordered_predicates(self, predicates):
+        """Return (field, value) pairs sorted from most to least selective."""
+        return sorted(predicates.items(), key=lambda item: self.cardinality(*item))
+
+    def lookup(self, predicates):
+        """Return a boolean mask of the plans matching every (field, value) predicate."""
+        if not predicates:
+            return np.ones(self.size, dtype=bool)
+
+        result = None
+        for field, value in self.ordered_predicates(predicates):
+            bitset = self.bitsets.get(field, {}).get(value)
+            if bitset is None:
+                return np.zeros(self.size, dtype=bool)
+            result = bitset.copy() if result is None else np.bitwise_and(result, bitset, out=result)
+            if not result.any():
+                return np.zeros(self.size, dtype=bool)
+        return np.unpackbits(result, count=self.size).astype(bool)
+
+
+class IntervalIndex:
+    """Centered interval tree over the distinct issue-age windows.
+
+    Plans share a handful of windows ("Age 0 to Age 50", ...), so the tree is
+    built over the distinct (low, high) pairs and each pair maps to a packed
+    bitset of the plans that carry it. A stabbing query for one age walks a
+    single root-to-leaf path and ORs the bitsets of the windows that contain
+    it. Plans with an unknown window are always treated as eligible.
+    """
+
+    def __init__(self, lows, highs):
+        self.size = len(lows)
+        known = (lows >= 0) & (highs >= lows)
+        self.unknown = np.packbits(~known)
+
+        pairs = np.unique(np.stack([lows[known], highs[known]], axis=1), axis=0) if known.any() else []
+        self.intervals = [(int(low), int(high)) for low, high in pairs]
+        self.bitsets = [np.packbits(known & (lows == low) & (highs == high)) for low, high in self.intervals]
+        self.root = self._build(list(range(len(self.intervals))))
+
+    def _build(self, members):
+        if not members:
+            return None
+        endpoints = sorted(point for i in members for point in self.intervals[i])
+        center = endpoints[len(endpoints) // 2]
+        here = [i for i in members if self.intervals[i][0] <= center <= self.intervals[i][1]]
+        return {
+            "center": center,
+            "by_low": sorted(here, key=lambda i: self.intervals[i][0]),
+            "by_high": sorted(here, key=lambda i: -self.intervals[i][1]),
+            "left": self._build([i for i in members if self.intervals[i][1] < center]),
+            "right": self._build([i for i in members if self.intervals[i][0] > center]),
+        }
+
+    def stab(self, point):
+        """Return the positions of the distinct windows that contain ``point``."""
+        found = []
+        node = self.root
+        while node is not None:
+            if point < node["center"]:
+                for i in node["by_low"]:
+                    if self.intervals[i][0] > point:
+                        break
+                    found.append(i)
+                node = node["left"]
+            elif point > node["center"]:
+                for i in node["by_high"]:
+                    if self.intervals[i][1] < point:
+                        break
+                    found.append(i)
+                node = node["right"]
+            else:
+                found.extend(node["by_low"])
+                break
+        return found
+
+    def lookup(self, point):
+        """Return a boolean mask of the plans an applicant aged ``point`` can buy."""
+        result = self.unknown.copy()
+        for i in self.stab(point):
+            np.bitwise_or(result, self.bitsets[i], out=result)
+        return np.unpackbits(result, count=self.size).astype(bool)
+
+
+# Mark the plans on the price-vs-score Pareto frontier of their segment
+def pareto_frontier_mask(segments, price, score):
+    """Return a mask of the plans no other plan in the same segment dominates.
+
+    A plan is dominated when another costs no more and scores no less, with
+    at least one strict. Plans are sorted by (segment, price, -score) and a
+    plan is on the frontier iff it beats the best score of every cheaper plan
+    in its segment. Plans with a missing price or score are never on it.
+    """
+    mask = np.zeros(len(price), dtype=bool)
+    candidates = np.flatnonzero(~(np.isnan(price) | np.isnan(score)))
+    if len(candidates) == 0:
+        return mask
+
+    order = candidates[np.lexsort((-score[candidates], price[candidates], segments[candidates]))]
+    seg, cost, value = segments[order], price[order], score[order]
+    n = len(order)
+
+    segment_start = np.ones(n, dtype=bool)
+    segment_start[1:] = seg[1:] != seg[:-1]
+    group_start = segment_start.copy()
+    group_start[1:] |= (cost[1:] != cost[:-1]) | (value[1:] != value[:-1])
+
+    # Segmented running max over integer score ranks: offset each segment so
+    # one cummax never crosses segments, and compare exactly
+    rank = np.unique(value, return_inverse=True)[1].reshape(-1).astype(np.int64)
+    offset = (np.cumsum(segment_start) - 1) * (rank.max() + 2)
+    running = np.maximum.accumulate(rank + offset + 1)
+    best_before = np.empty(n, dtype=np.int64)
+    best_before[0] = 0
+    best_before[1:] = running[:-1] - offset[1:]
+    best_before[segment_start] = 0
+
+    # Identical points share the verdict of the first point in their group
+    on_frontier = group_start & (rank + 1 > best_before)
+    group = np.maximum.accumulate(np.where(group_start, np.arange(n), 0))
+    mask[order] = on_frontier[group]
+    return mask
+
+
+# Round a byte offset up to the next multiple of 8
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class StringTable:
+    """Variable-length UTF-8 strings stored as one byte blob plus offsets."""
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def get(self, index):
+        """Return the string at ``index``."""
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode("utf-8")
+
+    def all(self):
+        """Return every string in the table."""
+        text = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        return [text[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+
+
+# Read the JSON header of a catalog snapshot without mapping the whole file
+def read_snapshot_header(path):
+    """Return the header dict of a snapshot file, or None if it is missing or invalid."""
+    try:
+        with open(path, "rb") as f:
+            magic, header_length = _SNAPSHOT_PREAMBLE.unpack(f.read(_SNAPSHOT_PREAMBLE.size))
+            if magic != SNAPSHOT_MAGIC:
+                return None
+            header = json.loads(f.read(header_length).decode("utf-8"))
+    except (OSError, ValueError, struct.error):
+        return None
+    return header if header.get("version") == SNAPSHOT_VERSION else None
+
+
+# Write the snapshot layout: preamble, JSON header, then each array in its own aligned section
+def _write_snapshot_file(path, rows, source, columns, vocabularies, string_tables):
+    """Write a snapshot file.
+
+    ``columns`` maps names to arrays and ``string_tables`` maps names to
+    (offsets, data), where data is a uint8 array or a binary file holding
+    offsets[-1] bytes, copied in chunks.
+    """
+    sections = []
+    position = 0
+
+    def add_section(payload, dtype, count, nbytes):
+        nonlocal position
+        position = _align(position)
+        sections.append((position, payload))
+        spec = {"dtype": dtype, "offset": position, "count": count}
+        position += nbytes
+        return spec
+
+    def add_array(values):
+        values = np.ascontiguousarray(values)
+        return add_section(values, values.dtype.str, len(values), values.nbytes)
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "rows": rows,
+        "source": source,
+        "columns": {},
+        "vocabularies": {},
+        "string_tables": {},
+    }
+    for name in ENCODED_COLUMNS:
+        header["columns"][name] = add_array(columns[name])
+        header["vocabularies"][name] = sorted(vocabularies[name], key=vocabularies[name].get)
+    for name in NUMERIC_COLUMNS:
+        header["columns"][name] = add_array(columns[name])
+
+    for name, (offsets, data) in string_tables.items():
+        size = int(offsets[-1])
+        header["string_tables"][name] = {
+            "offsets": add_array(offsets),
+            "data": add_array(data) if isinstance(data, np.ndarray) else add_section(data, "|u1", size, size),
+        }
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    data_start = _align(_SNAPSHOT_PREAMBLE.size + len(header_bytes))
+    with open(path, "wb") as f:
+        f.write(_SNAPSHOT_PREAMBLE.pack(SNAPSHOT_MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for offset, payload in sections:
+            f.write(b"\0" * (data_start + offset - f.tell()))
+            if isinstance(payload, np.ndarray):
+                f.write(payload.tobytes())
+            else:
+                payload.seek(0)
+                shutil.copyfileobj(payload, f)
+
+# Compile plan dicts straight into a snapshot file, one plan at a time
+def write_plans_snapshot(path, plans, source=None):
+    """Write the snapshot ``PlanStore(plans).write_snapshot`` would, without holding the plans.
+
+    ``plans`` may be any iterable, such as a JSON Lines reader. Only the
+    fixed-width columns and string offsets are kept in memory; the serialized
+    records and ids are spooled to temporary files. Returns the row count.
+    """
+    vocabularies = {name: {} for name in ENCODED_COLUMNS}
+    columns = {name: array("i") for name in ENCODED_COLUMNS}
+    columns.update({name: array("q" if name in INTEGER_COLUMNS else "d") for name in NUMERIC_COLUMNS})
+    offsets = {"ids": array("q", [0]), "records": array("q", [0])}
+
+    with tempfile.TemporaryFile() as ids_data, tempfile.TemporaryFile() as records_data:
+        spools = {"ids": ids_data, "records": records_data}
+        rows = 0
+        for plan in plans:
+            values = plan_column_values(plan)
+            for name in ENCODED_COLUMNS:
+                value = values[name]
+                if value is None:
+                    columns[name].append(MISSING_CODE)
+                else:
+                    columns[name].append(vocabularies[name].setdefault(value, len(vocabularies[name])))
+            for name in NUMERIC_COLUMNS:
+                columns[name].append(parse_int(values[name]) if name in INTEGER_COLUMNS
+                                     else parse_float(values[name]))
+            for name, text in (("ids", str(plan.get("id"))), ("records", json.dumps(plan, ensure_ascii=False))):
+                encoded = text.encode("utf-8")
+                spools[name].write(encoded)
+                offsets[name].append(offsets[name][-1] + len(encoded))
+            rows += 1
+
+        arrays = {name: np.frombuffer(column, dtype=np.int32 if name in ENCODED_COLUMNS
+                                      else np.int64 if name in INTEGER_COLUMNS else np.float64)
+                  for name, column in columns.items()}
+        string_tables = {name: (np.frombuffer(offsets[name], dtype=np.int64), spools[name])
+                         for name in ("ids", "records")}
+        _write_snapshot_file(path, rows, source, arrays, vocabularies, string_tables)
+    return rows
+
+
+class PlanStore:
+    """Columnar NumPy view of the plan catalog, built once per catalog load.
+
+    The arrays hold the fields the filters need so predicates run as
+    vectorized masks instead of a Python loop over nested dicts. A store is
+    either built from plan dicts or opened from a memory-mapped snapshot, in
+    which case each plan dict is decoded only when it is first accessed.
+    """
+
+    def __init__(self, plans):
+        self._plans = list(plans)
+        self._records = None
+        self.ids = [plan.get("id") for plan in self._plans]
+
+        values = [plan_column_values(plan) for plan in self._plans]
+
+        # Categorical columns and titles are stored as integer codes
+        for name in ENCODED_COLUMNS:
+            codes, vocabulary = encode_categorical([row[name] for row in values])
+            setattr(self, name, codes)
+            setattr(self, name + "_vocabulary", vocabulary)
+
+        # Numeric columns; unparseable ages are -1 and unparseable scores NaN so
+        # that, as before, such plans are never excluded by those predicates. The
+        # typed payout, waiting period and issue age columns use the same
+        # sentinels and never satisfy a range predicate.
+        for name in NUMERIC_COLUMNS:
+            column = [row[name] for row in values]
+            setattr(self, name, parse_int_column(column) if name in INTEGER_COLUMNS else parse_float_column(column))
+
+        self._build_indexes()
+
+    @classmethod
+    def from_snapshot(cls, path):
+        """Open a snapshot written by ``write_snapshot`` with memory mapping.
+
+        Column arrays are zero-copy views of the mapped file, so the OS pages
+        them in lazily; plan dicts are decoded from the string table on access.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = _SNAPSHOT_PREAMBLE.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a plan catalog snapshot")
+        header = json.loads(buffer[_SNAPSHOT_PREAMBLE.size:_SNAPSHOT_PREAMBLE.size + header_length].decode("utf-8"))
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version in {path}")
+        data_start = _align(_SNAPSHOT_PREAMBLE.size + header_length)
+
+        def section(spec):
+            return np.frombuffer(buffer, dtype=np.dtype(spec["dtype"]), count=spec["count"],
+                                 offset=data_start + spec["offset"])
+
+        store = cls.__new__(cls)
+        for name in ENCODED_COLUMNS:
+            setattr(store, name, section(header["columns"][name]))
+            vocabulary = {value: code for code, value in enumerate(header["vocabularies"][name])}
+            setattr(store, name + "_vocabulary", vocabulary)
+        for name in NUMERIC_COLUMNS:
+            setattr(store, name, section(header["columns"][name]))
+
+        tables = {
+            name: StringTable(section(spec["offsets"]), section(spec["data"]))
+            for name, spec in header["string_tables"].items()
+        }
+        store.ids = tables["ids"].all()
+        store._records = tables["records"]
+        store._plans = [None] * header["rows"]
+        store._build_indexes()
+        return store
+
+    def write_snapshot(self, path, source=None):
+        """Write the store as a binary snapshot: fixed-width columns plus string tables."""
+        columns = {name: getattr(self, name) for name in ENCODED_COLUMNS + NUMERIC_COLUMNS}
+        vocabularies = {name: getattr(self, name + "_vocabulary") for name in ENCODED_COLUMNS}
+        records = [json.dumps(self.plan(i), ensure_ascii=False) for i in range(len(self))]
+        string_tables = {}
+        for name, strings in (("ids", [str(plan_id) for plan_id in self.ids]), ("records", records)):
+            table = StringTable.from_strings(strings)
+            string_tables[name] = (table.offsets, table.data)
+        _write_snapshot_file(path, len(self), source, columns, vocabularies, string_tables)
+
+    def _build_indexes(self):
+        # Hash index from plan id to catalog position
+        self.id_index = {plan_id: i for i, plan_id in enumerate(self.ids)}
+
+        # Bitmap index over the categorical columns used by most filters
+        self.bitmap_index = BitmapIndex(len(self))
+        for name in CATEGORICAL_COLUMNS:
+            self.bitmap_index.add_column(name, getattr(self, name), getattr(self, name + "_vocabulary"))
+
+        # Interval index over the issue-age eligibility windows
+        self.issue_age_index = IntervalIndex(self.issue_age_min, self.issue_age_max)
+
+        # Product code per (company, title), shared by a plan's premium-term variants
+        products = np.stack([self.company, self.title], axis=1)
+        self.product = np.unique(products, axis=0, return_inverse=True)[1].reshape(-1)
+        self.segment_views = {}
+
+        # Customer segments: one per (gender, quoted age, smoker status)
+        keys = np.stack([self.gender, self.age, self.smoker_status], axis=1)
+        segment_keys, segment = np.unique(keys, axis=0, return_inverse=True)
+        self.segment = segment.reshape(-1)
+        genders = {code: value for value, code in self.gender_vocabulary.items()}
+        smoker_statuses = {code: value for value, code in self.smoker_status_vocabulary.items()}
+        self.segment_index = {
+            (genders.get(int(g)), int(a), smoker_statuses.get(int(sm))): code
+            for code, (g, a, sm) in enumerate(segment_keys.tolist())
+        }
+        self.segment_ages = np.unique(self.age[self.age >= 0])
+
+        # Pareto frontier per segment, stored as price-ordered plan indices
+        self.pareto_mask = {}
+        self.frontiers = {}
+        self.value_pick_ids = {}
+        for score_column in PARETO_SCORE_COLUMNS:
+            mask = pareto_frontier_mask(self.segment, self.price, getattr(self, score_column))
+            members = np.flatnonzero(mask)
+            members = members[np.lexsort((members, self.price[members], self.segment[members]))]
+            bounds = np.searchsorted(self.segment[members], np.arange(len(segment_keys) + 1))
+            self.pareto_mask[score_column] = mask
+            self.frontiers[score_column] = [members[bounds[i]:bounds[i + 1]] for i in range(len(segment_keys))]
+            self.value_pick_ids[score_column] = frozenset(self.ids[i] for i in members)
+
+    def __len__(self):
+        return len(self._plans)
+
+    @property
+    def plans(self):
+        """All plan dicts, in catalog order (decodes any not yet decoded)."""
+        if self._records is not None:
+            for i in range(len(self._plans)):
+                self.plan(i)
+            # Every record is decoded, so the string table is no longer needed
+            self._records = None
+        return self._plans
+
+    def plan(self, index):
+        """Return the plan dict at ``index``, decoding it from the snapshot if needed."""
+        # Read the table before the slot: ``plans`` drops it only once every slot is filled
+        records = self._records
+        plan = self._plans[index]
+        if plan is None:
+            plan = json.loads(records.get(index))
+            self._plans[index] = plan
+        return plan
+
+    def filter_mask(self, gender=None, age=None, smoker_status=None, max_price=None, min_score=None,
+                    company=None, premium_term_years=None, max_waiting_period_days=None,
+                    min_payout_percent=None, max_payout_percent=None):
+        """Return a boolean mask of the plans matching every given criterion."""
+        # Categorical predicates are answered from the bitmap index
+        predicates = {}
+        if gender:
+            predicates["gender"] = gender
+        if smoker_status:
+            predicates["smoker_status"] = smoker_status
+        if company:
+            predicates["company"] = company
+        if premium_term_years:
+            predicates["premium_term_years"] = premium_term_years
+        mask = self.bitmap_index.lookup(predicates)
+        if not mask.any():
+            return mask
+
+        # The input age must be at least the plan's quoted age and fall inside
+        # its issue-age window
+        if age:
+            mask &= self.age <= age
+            mask &= self.issue_age_index.lookup(age)
+
+        # NaN prices compare False, matching the old "price > max_price" exclusion
+        if max_price:
+            mask &= ~(self.price > max_price)
+
+        if min_score:
+            mask &= ~(self.total_score < min_score)
+
+        # Range predicates on the typed columns; plans with unknown values are excluded
+        if max_waiting_period_days is not None:
+            mask &= self.waiting_period_days <= max_waiting_period_days
+
+        if min_payout_percent is not None:
+            mask &= self.maximum_payout_percent >= min_payout_percent
+
+        if max_payout_percent is not None:
+            mask &= self.maximum_payout_percent <= max_payout_percent
+
+        return mask
+
+    def filter_indices(self, **criteria):
+        """Return the indices of the plans matching the criteria, in catalog order."""
+        return np.flatnonzero(self.filter_mask(**criteria))
+
+    def top_k(self, indices, score_column, k):
+        """Return up to ``k`` of ``indices`` ordered by ``score_column``, highest first.
+
+        Uses a partial selection (argpartition) so only the winners are sorted;
+        ties keep catalog order and unparseable scores rank last.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if k <= 0 or len(indices) == 0:
+            return indices[:0]
+        scores = np.nan_to_num(getattr(self, score_column)[indices].astype(np.float64), nan=-np.inf)
+        if len(indices) > k:
+            # Keep every index tied with the k-th score so ties resolve by position
+            threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+            keep = scores >= threshold
+            indices, scores = indices[keep], scores[keep]
+        order = np.lexsort((indices, -scores))[:k]
+        return indices[order]
+
+    def bracket_age(self, age):
+        """Return the highest quoted age at or below ``age``, or None if every quote is older.
+
+        This is the price bracket an applicant of that age is quoted in.
+        """
+        position = np.searchsorted(self.segment_ages, age, side="right") - 1
+        if position < 0:
+            return None
+        return int(self.segment_ages[position])
+
+    def find_segment(self, gender, age, smoker_status):
+        """Return the segment code for an applicant, or None if the catalog has none.
+
+        ``age`` is mapped to its price bracket, see ``bracket_age``.
+        """
+        bracket = self.bracket_age(age)
+        if bracket is None:
+            return None
+        return self.segment_index.get((gender, bracket, smoker_status))
+
+    def frontier_indices(self, gender, age, smoker_status, score_column="total_score"):
+        """Return the price-ordered Pareto frontier of an applicant's segment."""
+        segment = self.find_segment(gender, age, smoker_status)
+        if segment is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.frontiers[score_column][segment]
+
+    def is_dominated(self, index, score_column="total_score"):
+        """Return True if a plan in the same segment is cheaper and scores better."""
+        if np.isnan(self.price[index]) or np.isnan(getattr(self, score_column)[index]):
+            return False
+        return not self.pareto_mask[score_column][index]
+
+    def distinct_ranked(self, indices):
+        """Return one plan per (company, title) from ``indices``, best whole-life score first.
+
+        Matches the plans screen: each product keeps the slot of its first
+        occurrence and the variant with the highest total score (earliest on
+        ties), then the list is stably sorted by whole-life score, highest first.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) == 0:
+            return indices
+        product = self.product[indices]
+        score = np.nan_to_num(self.total_score[indices].astype(np.float64), nan=-np.inf)
+        positions = np.arange(len(indices))
+
+        _, first_slot = np.unique(product, return_index=True)
+        order = np.lexsort((positions, -score, product))
+        winners = order[np.r_[True, product[order][1:] != product[order][:-1]]]
+        chosen = indices[winners[np.argsort(first_slot, kind="stable")]]
+
+        whole_life = np.nan_to_num(self.whole_life_score[chosen].astype(np.float64), nan=0.0)
+        return chosen[np.argsort(-whole_life, kind="stable")]
+
+    def materialize_segment_views(self, genders, ages, smoker_statuses):
+        """Precompute ``distinct_ranked`` results for every (gender, age, smoker status).
+
+        Ages only change the result where a quoted age or an issue-age bound
+        is crossed, so each age class is computed once and shared.
+        """
+        known = np.concatenate([self.age, self.issue_age_min, self.issue_age_max + 1])
+        breakpoints = np.unique(known[known >= 0])
+        views = {}
+        for gender in genders:
+            for smoker_status in smoker_statuses:
+                by_class = {}
+                for age in ages:
+                    age_class = int(np.searchsorted(breakpoints, age, side="right"))
+                    if age_class not in by_class:
+                        candidates = self.filter_indices(gender=gender, age=age, smoker_status=smoker_status)
+                        by_class[age_class] = {
+                            "indices": self.distinct_ranked(candidates),
+                            "max_price": float(np.nanmax(self.price[candidates])) if len(candidates) else 0.0,
+                            "min_score": float(np.nanmin(self.total_score[candidates])) if len(candidates) else 0.0,
+                            **self._product_histograms(candidates),
+                        }
+                    views[(gender, age, smoker_status)] = by_class[age_class]
+        self.segment_views = views
+
+    def _product_histograms(self, candidates):
+        """Return sorted per-product price and score thresholds for ``candidates``.
+
+        A product is listed under a price limit if any of its variants costs
+        no more, and above a score limit if any variant scores at least that
+        much, so ``searchsorted`` on these arrays gives the count the plans
+        screen would show. Missing values never exclude a plan, as in the
+        filters, so they sort as -inf prices and +inf scores.
+        """
+        products, inverse = np.unique(self.product[candidates], return_inverse=True)
+        prices = np.full(len(products), np.inf)
+        scores = np.full(len(products), -np.inf)
+        np.minimum.at(prices, inverse, np.nan_to_num(self.price[candidates], nan=-np.inf))
+        np.maximum.at(scores, inverse, np.nan_to_num(self.total_score[candidates], nan=np.inf))
+        return {"price_thresholds": np.sort(prices), "score_thresholds": np.sort(scores)}
+
+    def facet_counts(self, **criteria):
+        """Return {field: {value: plan count}} for the categorical fields.
+
+        Each field is counted with every other criterion applied but its own,
+        so the counts show what picking another value of that field would give.
+        """
+        facets = {}
+        for field in CATEGORICAL_COLUMNS:
+            others = {key: value for key, value in criteria.items() if key != field}
+            codes = getattr(self, field)[self.filter_mask(**others)]
+            vocabulary = getattr(self, field + "_vocabulary")
+            counts = np.bincount(codes[codes >= 0], minlength=len(vocabulary))
+            facets[field] = {value: int(counts[code]) for value, code in vocabulary.items() if counts[code]}
+        return facets
+
+    def segment_view(self, gender, age, smoker_status, max_price=None, min_score=None):
+        """Return the ranked, de-duplicated indices for a segment.
+
+        A materialized view is returned as-is when the price and score limits
+        exclude none of the segment's plans; otherwise the segment is filtered
+        and ranked on the spot.
+        """
+        view = self.segment_views.get((gender, age, smoker_status))
+        if view is not None and (not max_price or view["max_price"] <= max_price) \
+                and (not min_score or view["min_score"] >= min_score):
+            return view["indices"]
+        candidates = self.filter_indices(gender=gender, age=age, smoker_status=smoker_status,
+                                         max_price=max_price, min_score=min_score)
+        return self.distinct_ranked(candidates)
+
+    def get(self, plan_id):
+        """Return the plan with the given id, or None if it is not in the catalog."""
+        index = self.id_index.get(plan_id)
+        return self.plan(index) if index is not None else None
+
+    def get_many(self, plan_ids):
+        """Return the plans for the given ids in order, with None for unknown ids."""
+        id_index = self.id_index
+        return [self.plan(id_index[plan_id]) if plan_id in id_index else None for plan_id in plan_ids]
+
+    def take(self, indices):
+        """Return the plan dicts at the given indices."""
+        return [self.plan(i) for i in indices]
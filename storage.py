@@ -0,0 +1,484 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Fields of a saved plan reference; anything else on a stored entry is a legacy full plan copy
+SAVED_ENTRY_FIELDS = ("id", "date_saved", "snapshot")
+
+
+# Normalize a stored saved plan entry to {"id", "date_saved", "snapshot"}
+def normalize_saved_entry(entry):
+    """Return a saved plan reference, turning legacy full plan copies into snapshots."""
+    snapshot = entry.get('snapshot')
+    if snapshot is None and any(key not in SAVED_ENTRY_FIELDS for key in entry):
+        snapshot = {key: value for key, value in entry.items() if key != 'date_saved'}
+    return {"id": entry['id'], "date_saved": entry.get('date_saved'), "snapshot": snapshot}
+
+
+# Build the JSON record stored for a saved plan reference
+def _saved_entry_record(plan_id, date_saved, snapshot=None):
+    record = {"id": plan_id, "date_saved": date_saved}
+    if snapshot is not None:
+        record["snapshot"] = snapshot
+    return record
+
+
+# Apply an id migration to a saved plan entry and its snapshot
+def _remap_entry(entry, id_map):
+    snapshot = entry.get('snapshot')
+    if snapshot is not None:
+        snapshot = dict(snapshot, id=id_map[entry['id']])
+    return _saved_entry_record(id_map[entry['id']], entry.get('date_saved'), snapshot)
+
+
+# Build a saved plan entry from an SQLite row
+def _entry_from_row(plan_id, date_saved, snapshot):
+    return normalize_saved_entry({
+        "id": plan_id,
+        "date_saved": date_saved,
+        "snapshot": json.loads(snapshot) if snapshot is not None else None
+    })
+
+
+class JsonStorage:
+    """Saved plans and user profiles kept in JSON files (the default backend).
+
+    Every mutation rewrites the whole file, so the lock only guards against
+    concurrent writers within this process.
+    """
+
+    def __init__(self, saved_plans_file, user_profiles_file):
+        self.saved_plans_file = saved_plans_file
+        self.user_profiles_file = user_profiles_file
+        self._lock = threading.RLock()
+
+    # Read a JSON object file, resetting it if it is corrupted
+    def _read(self, path):
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            # If the file is corrupted, reset it
+            self._write(path, {})
+            return {}
+
+    # Write a JSON object file atomically
+    def _write(self, path, data):
+        temp_file = path + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(data, f, indent=4)
+        os.replace(temp_file, path)
+
+    def get_saved_plans(self, user_id):
+        """Return a user's saved plan entries, in the order they were saved."""
+        with self._lock:
+            return [normalize_saved_entry(entry) for entry in self._read(self.saved_plans_file).get(user_id, [])]
+
+    def all_saved_plans(self):
+        """Return {user_id: [saved plan entries]} for every user."""
+        with self._lock:
+            saved_plans_data = self._read(self.saved_plans_file)
+        return {user_id: [normalize_saved_entry(entry) for entry in entries]
+                for user_id, entries in saved_plans_data.items()}
+
+    def add_saved_plan(self, user_id, plan_id, date_saved, snapshot=None):
+        """Store a saved plan reference unless the user already saved that plan id."""
+        with self._lock:
+            saved_plans_data = self._read(self.saved_plans_file)
+            user_plans = saved_plans_data.setdefault(user_id, [])
+            if any(entry['id'] == plan_id for entry in user_plans):
+                return
+            user_plans.append(_saved_entry_record(plan_id, date_saved, snapshot))
+            self._write(self.saved_plans_file, saved_plans_data)
+
+    def remove_saved_plan(self, user_id, plan_id):
+        """Remove a plan from a user's saved plans; False if the user has none."""
+        with self._lock:
+            saved_plans_data = self._read(self.saved_plans_file)
+            if user_id not in saved_plans_data:
+                return False
+            saved_plans_data[user_id] = [entry for entry in saved_plans_data[user_id] if entry['id'] != plan_id]
+            self._write(self.saved_plans_file, saved_plans_data)
+            return True
+
+    def apply_changes(self, saved_plan_changes, profiles):
+        """Apply a batch of changes with at most one write per file.
+
+        ``saved_plan_changes`` maps (user_id, plan_id) to None for a removal or
+        to {"date_saved", "snapshot"} for an addition; ``profiles`` maps
+        user_id to a full profile.
+        """
+        with self._lock:
+            if saved_plan_changes:
+                saved_plans_data = self._read(self.saved_plans_file)
+                for (user_id, plan_id), change in saved_plan_changes.items():
+                    if change is None:
+                        if user_id in saved_plans_data:
+                            saved_plans_data[user_id] = [entry for entry in saved_plans_data[user_id]
+                                                         if entry['id'] != plan_id]
+                        continue
+                    user_plans = saved_plans_data.setdefault(user_id, [])
+                    if not any(entry['id'] == plan_id for entry in user_plans):
+                        user_plans.append(_saved_entry_record(plan_id, change['date_saved'], change['snapshot']))
+                self._write(self.saved_plans_file, saved_plans_data)
+            
+            if profiles:
+                stored_profiles = self._read(self.user_profiles_file)
+                stored_profiles.update(profiles)
+                self._write(self.user_profiles_file, stored_profiles)
+
+    def remap_saved_plan_ids(self, id_map):
+        """Rewrite saved plan ids using an {old_id: new_id} mapping."""
+        self._update_entries(lambda entry: _remap_entry(entry, id_map) if entry['id'] in id_map else None)
+
+    def set_snapshots(self, snapshots):
+        """Attach (or, with None, drop) plan snapshots on every saved entry of those plan ids."""
+        self._update_entries(lambda entry: _saved_entry_record(entry['id'], entry['date_saved'],
+                                                               snapshots[entry['id']])
+                             if entry['id'] in snapshots else None)
+
+    # Rewrite entries for which ``update`` returns a replacement record
+    def _update_entries(self, update):
+        with self._lock:
+            saved_plans_data = self._read(self.saved_plans_file)
+            changed = False
+            for user_plans in saved_plans_data.values():
+                for i, entry in enumerate(user_plans):
+                    record = update(normalize_saved_entry(entry))
+                    if record is not None:
+                        user_plans[i] = record
+                        changed = True
+            if changed:
+                self._write(self.saved_plans_file, saved_plans_data)
+
+    def get_user_profile(self, user_id):
+        """Return a user's profile, or an empty dict."""
+        with self._lock:
+            return self._read(self.user_profiles_file).get(user_id, {})
+
+    def all_user_profiles(self):
+        """Return {user_id: profile} for every user."""
+        with self._lock:
+            return self._read(self.user_profiles_file)
+
+    def save_user_profile(self, user_id, profile):
+        """Create or replace a user's profile."""
+        with self._lock:
+            profiles = self._read(self.user_profiles_file)
+            profiles[user_id] = profile
+            self._write(self.user_profiles_file, profiles)
+
+
+class SqliteStorage:
+    """Saved plans and user profiles in an SQLite database in WAL mode.
+
+    Reads are indexed by user and writes touch a single row, so their cost
+    does not grow with the number of users, and WAL lets concurrent sessions
+    read while another one writes. Each thread gets its own connection.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS saved_plans (
+            user_id TEXT NOT NULL,
+            plan_id TEXT NOT NULL,
+            date_saved TEXT,
+            snapshot TEXT,
+            PRIMARY KEY (user_id, plan_id)
+        );
+        CREATE TABLE IF NOT EXISTS user_profiles (
+            user_id TEXT PRIMARY KEY,
+            profile TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.executescript(self.SCHEMA)
+
+    # Get this thread's connection, opening it on first use
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_file, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get_saved_plans(self, user_id):
+        """Return a user's saved plan entries, in the order they were saved."""
+        rows = self._connection().execute(
+            "SELECT plan_id, date_saved, snapshot FROM saved_plans WHERE user_id = ? ORDER BY rowid", (user_id,)
+        ).fetchall()
+        return [_entry_from_row(*row) for row in rows]
+
+    def all_saved_plans(self):
+        """Return {user_id: [saved plan entries]} for every user."""
+        saved_plans_data = {}
+        rows = self._connection().execute(
+            "SELECT user_id, plan_id, date_saved, snapshot FROM saved_plans ORDER BY rowid"
+        )
+        for user_id, plan_id, date_saved, snapshot in rows:
+            saved_plans_data.setdefault(user_id, []).append(_entry_from_row(plan_id, date_saved, snapshot))
+        return saved_plans_data
+
+    def add_saved_plan(self, user_id, plan_id, date_saved, snapshot=None):
+        """Store a saved plan reference unless the user already saved that plan id."""
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO saved_plans (user_id, plan_id, date_saved, snapshot) VALUES (?, ?, ?, ?)",
+                (user_id, plan_id, date_saved, json.dumps(snapshot) if snapshot is not None else None)
+            )
+
+    def remove_saved_plan(self, user_id, plan_id):
+        """Remove a plan from a user's saved plans."""
+        with self._connection() as connection:
+            connection.execute("DELETE FROM saved_plans WHERE user_id = ? AND plan_id = ?", (user_id, plan_id))
+        return True
+
+    def remap_saved_plan_ids(self, id_map):
+        """Rewrite saved plan ids using an {old_id: new_id} mapping."""
+        with self._connection() as connection:
+            rows = connection.execute("SELECT rowid, plan_id, date_saved, snapshot FROM saved_plans").fetchall()
+            for rowid, plan_id, date_saved, snapshot in rows:
+                if plan_id not in id_map:
+                    continue
+                entry = _remap_entry(_entry_from_row(plan_id, date_saved, snapshot), id_map)
+                snapshot = entry.get('snapshot')
+                connection.execute(
+                    "UPDATE OR REPLACE saved_plans SET plan_id = ?, snapshot = ? WHERE rowid = ?",
+                    (entry['id'], json.dumps(snapshot) if snapshot is not None else None, rowid)
+                )
+
+    def apply_changes(self, saved_plan_changes, profiles):
+        """Apply a batch of saved plan and profile changes in one transaction.
+
+        Takes the same arguments as JsonStorage.apply_changes.
+        """
+        additions = []
+        removals = []
+        for (user_id, plan_id), change in saved_plan_changes.items():
+            if change is None:
+                removals.append((user_id, plan_id))
+            else:
+                snapshot = change['snapshot']
+                additions.append((user_id, plan_id, change['date_saved'],
+                                  json.dumps(snapshot) if snapshot is not None else None))
+        
+        with self._connection() as connection:
+            connection.executemany("DELETE FROM saved_plans WHERE user_id = ? AND plan_id = ?", removals)
+            connection.executemany(
+                "INSERT OR IGNORE INTO saved_plans (user_id, plan_id, date_saved, snapshot) VALUES (?, ?, ?, ?)",
+                additions
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO user_profiles (user_id, profile) VALUES (?, ?)",
+                [(user_id, json.dumps(profile)) for user_id, profile in profiles.items()]
+            )
+
+    def set_snapshots(self, snapshots):
+        """Attach (or, with None, drop) plan snapshots on every saved entry of those plan ids."""
+        with self._connection() as connection:
+            connection.executemany(
+                "UPDATE saved_plans SET snapshot = ? WHERE plan_id = ?",
+                [(json.dumps(snapshot) if snapshot is not None else None, plan_id)
+                 for plan_id, snapshot in snapshots.items()]
+            )
+
+    def get_user_profile(self, user_id):
+        """Return a user's profile, or an empty dict."""
+        row = self._connection().execute(
+            "SELECT profile FROM user_profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def all_user_profiles(self):
+        """Return {user_id: profile} for every user."""
+        rows = self._connection().execute("SELECT user_id, profile FROM user_profiles")
+        return {user_id: json.loads(profile) for user_id, profile in rows}
+
+    def save_user_profile(self, user_id, profile):
+        """Create or replace a user's profile."""
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO user_profiles (user_id, profile) VALUES (?, ?)",
+                (user_id, json.dumps(profile))
+            )
+
+
+class WriteBehindStorage:
+    """Buffers user data mutations in memory in front of another backend.
+
+    Saves, removals and profile writes are coalesced per (user, plan) and per
+    user, then applied to the backend in one ``apply_changes`` call once
+    ``flush_delay`` seconds have passed since the first buffered change, on
+    ``flush()``, or at interpreter shutdown. Reads overlay the buffered
+    changes, so callers always see their own writes. A batch that fails to
+    write stays buffered and is retried ``flush_delay`` seconds later. A
+    ``flush_delay`` of 0 writes through immediately.
+    """
+
+    def __init__(self, backend, flush_delay=0.5):
+        self.backend = backend
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        # Pending changes, and the batch currently being written by flush()
+        self._saved_plan_changes = OrderedDict()
+        self._profiles = {}
+        self._in_flight = (OrderedDict(), {})
+        atexit.register(self.flush)
+
+    # Start the debounce timer unless a flush is already scheduled
+    def _schedule_flush(self):
+        if self.flush_delay <= 0:
+            self.flush()
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write every buffered change to the backend now."""
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                saved_plan_changes, profiles = self._saved_plan_changes, self._profiles
+                if not saved_plan_changes and not profiles:
+                    return
+                self._saved_plan_changes, self._profiles = OrderedDict(), {}
+                self._in_flight = (saved_plan_changes, profiles)
+            
+            try:
+                self.backend.apply_changes(saved_plan_changes, profiles)
+            except Exception as e:
+                print(f"Error flushing user data: {str(e)}")
+                # Put the batch back under any newer changes so it is retried
+                with self._lock:
+                    saved_plan_changes.update(self._saved_plan_changes)
+                    profiles.update(self._profiles)
+                    self._saved_plan_changes, self._profiles = saved_plan_changes, profiles
+                # Re-arm the timer so the retry does not wait for another change; when writing
+                # through, the next change retries instead of flush() calling itself
+                if self.flush_delay > 0:
+                    self._schedule_flush()
+            finally:
+                with self._lock:
+                    self._in_flight = (OrderedDict(), {})
+
+    # Get the buffered changes (in-flight ones first, pending ones winning)
+    def _buffered(self):
+        with self._lock:
+            saved_plan_changes = OrderedDict(self._in_flight[0])
+            saved_plan_changes.update(self._saved_plan_changes)
+            profiles = dict(self._in_flight[1])
+            profiles.update(self._profiles)
+        return saved_plan_changes, profiles
+
+    def get_saved_plans(self, user_id):
+        """Return a user's saved plan entries, including buffered changes."""
+        saved_plan_changes, _ = self._buffered()
+        entries = self.backend.get_saved_plans(user_id)
+        
+        for (change_user_id, plan_id), change in saved_plan_changes.items():
+            if change_user_id != user_id:
+                continue
+            if change is None:
+                entries = [entry for entry in entries if entry['id'] != plan_id]
+            elif not any(entry['id'] == plan_id for entry in entries):
+                entries.append({"id": plan_id, "date_saved": change['date_saved'], "snapshot": change['snapshot']})
+        return entries
+
+    # Buffer one change per (user, plan), moving it to the end of the queue
+    def _buffer_saved_plan_changes(self, user_id, changes):
+        with self._lock:
+            for plan_id, change in changes:
+                key = (user_id, plan_id)
+                self._saved_plan_changes.pop(key, None)
+                self._saved_plan_changes[key] = change
+        self._schedule_flush()
+
+    def add_saved_plans(self, user_id, plan_ids, date_saved):
+        """Buffer saving several plans for a user."""
+        self._buffer_saved_plan_changes(
+            user_id, [(plan_id, {"date_saved": date_saved, "snapshot": None}) for plan_id in plan_ids]
+        )
+
+    def add_saved_plan(self, user_id, plan_id, date_saved, snapshot=None):
+        """Buffer saving a plan for a user."""
+        self._buffer_saved_plan_changes(user_id, [(plan_id, {"date_saved": date_saved, "snapshot": snapshot})])
+
+    def remove_saved_plans(self, user_id, plan_ids):
+        """Buffer removing several plans from a user's saved plans."""
+        self._buffer_saved_plan_changes(user_id, [(plan_id, None) for plan_id in plan_ids])
+        return True
+
+    def remove_saved_plan(self, user_id, plan_id):
+        """Buffer removing a plan from a user's saved plans."""
+        return self.remove_saved_plans(user_id, [plan_id])
+
+    def get_user_profile(self, user_id):
+        """Return a user's profile, including a buffered update."""
+        _, profiles = self._buffered()
+        if user_id in profiles:
+            return profiles[user_id]
+        return self.backend.get_user_profile(user_id)
+
+    def save_user_profile(self, user_id, profile):
+        """Buffer creating or replacing a user's profile."""
+        with self._lock:
+            self._profiles[user_id] = profile
+        self._schedule_flush()
+
+    # Bulk and maintenance operations go straight to the backend after a flush
+    def all_saved_plans(self):
+        self.flush()
+        return self.backend.all_saved_plans()
+
+    def all_user_profiles(self):
+        self.flush()
+        return self.backend.all_user_profiles()
+
+    def apply_changes(self, saved_plan_changes, profiles):
+        self.flush()
+        self.backend.apply_changes(saved_plan_changes, profiles)
+
+    def remap_saved_plan_ids(self, id_map):
+        self.flush()
+        self.backend.remap_saved_plan_ids(id_map)
+
+    def set_snapshots(self, snapshots):
+        self.flush()
+        self.backend.set_snapshots(snapshots)
+
+
+# Copy every saved plan and profile from one backend into another
+def migrate_storage(source, target):
+    """Copy all user data from ``source`` to ``target``; returns the copied counts.
+
+    Existing entries in the target are kept, so running it twice is harmless.
+    """
+    saved_plans = 0
+    for user_id, entries in source.all_saved_plans().items():
+        for entry in entries:
+            target.add_saved_plan(user_id, entry['id'], entry['date_saved'], entry['snapshot'])
+            saved_plans += 1
+
+    profiles = 0
+    for user_id, profile in source.all_user_profiles().items():
+        target.save_user_profile(user_id, profile)
+        profiles += 1
+
+    return {"saved_plans": saved_plans, "user_profiles": profiles}
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+import llm_cache
+from bounded_cache import BoundedLRU
+
+
+def test_lru_evicts_least_recently_used_and_counts_lookups():
+    cache = BoundedLRU(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 2}
+
+
+def test_get_or_build_does_not_cache_none():
+    cache = BoundedLRU(4)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return None
+
+    assert cache.get_or_build("missing", build) is None
+    assert cache.get_or_build("missing", build) is None
+    assert len(calls) == 2 and len(cache) == 0
+    assert cache.get_or_build("present", lambda: "value") == "value"
+    assert cache.get_or_build("present", build) == "value"
+
+
+@pytest.mark.parametrize("with_disk", [False, True])
+def test_llm_cache_counts_each_expiry_once(tmp_path, monkeypatch, with_disk):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_FILE", str(tmp_path / "llm_cache.db") if with_disk else "")
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_TTL", 0.05)
+    llm_cache.clear_llm_cache()
+    before = llm_cache.get_llm_cache_stats()
+
+    llm_cache.store_response("key", "cached answer")
+    assert llm_cache.get_cached_response("key") == "cached answer"
+    time.sleep(0.1)
+    assert llm_cache.get_cached_response("key") is None
+
+    after = llm_cache.get_llm_cache_stats()
+    assert after["expired"] - before["expired"] == 1
+    assert after["memory_hits"] - before["memory_hits"] == 1
+    assert after["cached_responses"] == 0
+    llm_cache.clear_llm_cache()
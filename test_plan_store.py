@@ -0,0 +1,89 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import data_manager
+from plan_store import PlanStore, write_plans_snapshot
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope="module")
+def plans():
+    df = pd.read_csv(os.path.join(REPO_DIR, data_manager.WHOLE_LIFE_CSV), delimiter=';', encoding='utf-8', nrows=200)
+    return data_manager.build_plans_from_frame(df)
+
+
+@pytest.mark.parametrize("typed_fields", [True, False])
+def test_streamed_snapshot_matches_store_snapshot(tmp_path, plans, typed_fields):
+    if not typed_fields:
+        # Catalogs written before the typed columns existed
+        typed = ("maximum_payout_percent", "waiting_period_days", "issue_age_min", "issue_age_max")
+        plans = [dict(plan, details={k: v for k, v in plan["details"].items() if k not in typed}) for plan in plans]
+
+    PlanStore(plans).write_snapshot(tmp_path / "store.snapshot", source=["catalog", 1, 2])
+    rows = write_plans_snapshot(tmp_path / "streamed.snapshot", iter(plans), source=["catalog", 1, 2])
+
+    assert rows == len(plans)
+    assert (tmp_path / "store.snapshot").read_bytes() == (tmp_path / "streamed.snapshot").read_bytes()
+
+
+def test_streamed_snapshot_of_empty_catalog(tmp_path):
+    write_plans_snapshot(tmp_path / "empty.snapshot", iter([]))
+    store = PlanStore.from_snapshot(tmp_path / "empty.snapshot")
+    assert len(store) == 0 and store.plans == []
+
+
+def test_jsonl_catalog_is_served_from_compiled_snapshot(tmp_path, monkeypatch, plans):
+    monkeypatch.chdir(tmp_path)
+    data_manager.ensure_data_dir()
+    with open(data_manager.WHOLE_LIFE_JSONL, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(plan, ensure_ascii=False) + "\n" for plan in plans)
+    data_manager.clear_catalog_cache()
+    try:
+        store = data_manager._get_catalog()
+        assert os.path.exists(data_manager.WHOLE_LIFE_SNAPSHOT)
+        assert store.plans == plans
+        expected = PlanStore(plans).filter_indices(gender="Male", age=35, smoker_status="Non Smoker")
+        assert store.filter_indices(gender="Male", age=35, smoker_status="Non Smoker").tolist() == expected.tolist()
+    finally:
+        data_manager.clear_catalog_cache()
+
+
+def test_plan_decodes_while_plans_drops_the_string_table(tmp_path, plans):
+    PlanStore(plans).write_snapshot(tmp_path / "catalog.snapshot")
+    store = PlanStore.from_snapshot(tmp_path / "catalog.snapshot")
+
+    class DecodeAllOnFirstMiss(list):
+        """Finish ``store.plans`` on another "thread" right after a reader sees an empty slot."""
+        triggered = False
+
+        def __getitem__(self, index):
+            value = super().__getitem__(index)
+            if value is None and not DecodeAllOnFirstMiss.triggered:
+                DecodeAllOnFirstMiss.triggered = True
+                store.plans
+            return value
+
+    store._plans = DecodeAllOnFirstMiss(store._plans)
+    assert store.plan(7) == plans[7]
+    assert store._records is None
+
+
+@pytest.mark.parametrize("criteria, quoted_age", [
+    ({"gender": "Male", "age": 47, "smoker_status": "Non Smoker"}, 45),
+    ({"gender": "Female", "age": 33, "smoker_status": "Smoker", "max_price": 400}, 30),
+    ({"age": 20}, 18)
+])
+def test_recommendations_are_quoted_in_the_applicants_age_bracket(monkeypatch, criteria, quoted_age):
+    df = pd.read_csv(os.path.join(REPO_DIR, data_manager.WHOLE_LIFE_CSV), delimiter=';', encoding='utf-8')
+    store = PlanStore(data_manager.build_plans_from_frame(df))
+    monkeypatch.setattr(data_manager, "_get_catalog", lambda: store)
+
+    recommended = data_manager.recommend_plans(criteria, k=3)
+    assert recommended
+    assert {plan["details"]["age"] for plan in recommended} == {quoted_age}
+    if "max_price" in criteria:
+        assert all(plan["price"] <= criteria["max_price"] for plan in recommended)
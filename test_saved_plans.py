@@ -0,0 +1,143 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import data_manager
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SAVED_ROWS = (0, 5, 9)
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Run data_manager against a small copy of the 10Life feed in a temporary directory."""
+    df = pd.read_csv(os.path.join(REPO_DIR, data_manager.WHOLE_LIFE_CSV), delimiter=';', encoding='utf-8', nrows=40)
+    monkeypatch.chdir(tmp_path)
+    df.to_csv(data_manager.WHOLE_LIFE_CSV, sep=';', index=False, encoding='utf-8')
+    monkeypatch.setattr(data_manager, "USER_DATA_FLUSH_DELAY", 0)
+    data_manager.initialize_data_files()
+    data_manager.set_storage_backend("json")
+    data_manager.clear_catalog_cache()
+    yield tmp_path
+    data_manager.flush_user_data()
+    data_manager.clear_catalog_cache()
+
+
+# Recreate the pre-migration layout: a positional-id catalog and full plan copies as saved plans
+def write_legacy_data(backend):
+    assert data_manager.import_whole_life_from_csv()
+    with open(data_manager.WHOLE_LIFE_FILE, encoding='utf-8') as f:
+        plans = json.load(f)
+    legacy_plans = [dict(plan, id=f"whole_life_{i}") for i, plan in enumerate(plans)]
+    with open(data_manager.WHOLE_LIFE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(legacy_plans, f, ensure_ascii=False, indent=4)
+    with open(data_manager.SAVED_PLANS_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"default": [dict(legacy_plans[i], date_saved="March 03, 2025") for i in SAVED_ROWS]}, f)
+
+    if backend == "sqlite":
+        data_manager.migrate_user_data_to_sqlite()
+    data_manager.set_storage_backend(backend)
+    data_manager.clear_catalog_cache()
+    return [plans[i]["id"] for i in SAVED_ROWS]
+
+
+# Remove every catalog file so the next lookup imports the CSV on its own
+def remove_catalog():
+    for path in (data_manager.WHOLE_LIFE_FILE, data_manager.WHOLE_LIFE_JSONL, data_manager.WHOLE_LIFE_SNAPSHOT):
+        if os.path.exists(path):
+            os.remove(path)
+    data_manager.clear_catalog_cache()
+
+
+IMPORTS = {
+    "plain": data_manager.import_whole_life_from_csv,
+    "stream": lambda: data_manager.import_whole_life_from_csv(stream=True),
+    "auto": remove_catalog,
+    "reimport": data_manager.reimport_whole_life_from_csv
+}
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+@pytest.mark.parametrize("import_kind", sorted(IMPORTS))
+def test_legacy_saved_plans_survive_full_import(workspace, backend, import_kind):
+    hash_ids = write_legacy_data(backend)
+
+    # Session start compacts saved plans that resolve against the (legacy) catalog
+    before = data_manager.get_saved_plans()
+    assert [plan["id"] for plan in before] == [f"whole_life_{i}" for i in SAVED_ROWS]
+
+    IMPORTS[import_kind]()
+    data_manager.clear_catalog_cache()
+
+    after = data_manager.get_saved_plans()
+    assert [plan["id"] for plan in after] == hash_ids
+    assert [plan["title"] for plan in after] == [plan["title"] for plan in before]
+    assert all(data_manager.get_plan_by_id(plan_id) is not None for plan_id in hash_ids)
+
+    # Compaction after the remap keeps every plan resolvable
+    assert [plan["id"] for plan in data_manager.get_saved_plans()] == hash_ids
+
+
+def test_reimport_leaves_saved_plans_alone_when_catalog_write_fails(workspace, monkeypatch):
+    write_legacy_data("json")
+    before = data_manager.get_saved_plans()
+
+    def failing_write(plans, path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(data_manager, "_write_catalog_file", failing_write)
+    assert data_manager.reimport_whole_life_from_csv() is None
+
+    data_manager.clear_catalog_cache()
+    assert data_manager.get_saved_plans() == before
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+@pytest.mark.parametrize("import_kind", ["plain", "stream", "reimport"])
+def test_saved_plan_dropped_from_feed_is_kept(workspace, backend, import_kind):
+    data_manager.set_storage_backend(backend)
+    assert data_manager.import_whole_life_from_csv()
+    data_manager.clear_catalog_cache()
+    plans = data_manager.get_whole_life_insurance()
+    saved_ids = [plans[i]["id"] for i in SAVED_ROWS]
+    assert data_manager.save_plans(saved_ids) == saved_ids
+    before = data_manager.get_saved_plans()
+
+    # The next feed no longer lists the second saved plan
+    df = pd.read_csv(data_manager.WHOLE_LIFE_CSV, delimiter=';', encoding='utf-8')
+    df.drop(index=SAVED_ROWS[1]).to_csv(data_manager.WHOLE_LIFE_CSV, sep=';', index=False, encoding='utf-8')
+    IMPORTS[import_kind]()
+    data_manager.clear_catalog_cache()
+
+    after = data_manager.get_saved_plans()
+    assert [plan["id"] for plan in after] == saved_ids
+    assert after == before
+    assert data_manager.get_plan_by_id(saved_ids[1]) is None
+
+
+@pytest.mark.parametrize("column", ["Age", "PremiumTerm_Years"])
+def test_empty_key_cell_keeps_every_other_plan_id(workspace, column):
+    assert data_manager.import_whole_life_from_csv()
+    data_manager.clear_catalog_cache()
+    ids = [plan["id"] for plan in data_manager.get_whole_life_insurance()]
+    saved_ids = [ids[i] for i in SAVED_ROWS]
+    data_manager.save_plans(saved_ids)
+
+    # One empty cell makes pandas read the whole column as floats
+    df = pd.read_csv(data_manager.WHOLE_LIFE_CSV, delimiter=';', encoding='utf-8')
+    df.loc[len(df) - 1, column] = None
+    df.to_csv(data_manager.WHOLE_LIFE_CSV, sep=';', index=False, encoding='utf-8')
+
+    summary = data_manager.reimport_whole_life_from_csv()
+    assert summary["removed"] == [ids[-1]] and len(summary["added"]) == 1
+    data_manager.clear_catalog_cache()
+    assert [plan["id"] for plan in data_manager.get_whole_life_insurance()][:-1] == ids[:-1]
+    assert all(entry["snapshot"] is None for entry in data_manager.get_storage().get_saved_plans("default"))
+    assert [plan["id"] for plan in data_manager.get_saved_plans()] == saved_ids
+
+    # Streaming in chunks only the last of which has the empty cell gives the same ids
+    assert data_manager.import_whole_life_from_csv(stream=True, chunk_rows=10)
+    data_manager.clear_catalog_cache()
+    assert [plan["id"] for plan in data_manager.iter_whole_life_insurance()][:-1] == ids[:-1]
@@ -0,0 +1,196 @@
+import threading
+import time
+
+from storage import JsonStorage, SqliteStorage, WriteBehindStorage, migrate_storage
+
+
+class RecordingStorage(JsonStorage):
+    """JsonStorage that records each batch and can fail or block while applying one."""
+
+    def __init__(self, directory, failures=0):
+        super().__init__(str(directory / "saved_plans.json"), str(directory / "user_profiles.json"))
+        self.batches = []
+        self.failures = failures
+        self.applying = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def apply_changes(self, saved_plan_changes, profiles):
+        self.applying.set()
+        self.release.wait()
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.batches.append((dict(saved_plan_changes), dict(profiles)))
+        super().apply_changes(saved_plan_changes, profiles)
+
+
+# Wait until ``condition()`` holds, failing after a few seconds
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_changes_are_coalesced_into_one_batch(tmp_path):
+    backend = RecordingStorage(tmp_path)
+    storage = WriteBehindStorage(backend, flush_delay=60)
+    storage.add_saved_plans("alice", ["a", "b"], "March 03, 2025")
+    storage.remove_saved_plan("alice", "a")
+    storage.add_saved_plan("bob", "c", "March 04, 2025")
+    storage.save_user_profile("alice", {"age": 30})
+    storage.save_user_profile("alice", {"age": 31})
+    assert backend.batches == []
+
+    storage.flush()
+    assert len(backend.batches) == 1
+    saved_plan_changes, profiles = backend.batches[0]
+    assert list(saved_plan_changes) == [("alice", "b"), ("alice", "a"), ("bob", "c")]
+    assert saved_plan_changes[("alice", "a")] is None
+    assert profiles == {"alice": {"age": 31}}
+    assert [entry["id"] for entry in backend.get_saved_plans("alice")] == ["b"]
+
+    # Nothing left to write
+    storage.flush()
+    assert len(backend.batches) == 1
+
+
+def test_reads_overlay_pending_changes(tmp_path):
+    backend = RecordingStorage(tmp_path)
+    backend.add_saved_plan("alice", "a", "March 01, 2025")
+    backend.save_user_profile("alice", {"age": 30})
+    storage = WriteBehindStorage(backend, flush_delay=60)
+
+    storage.remove_saved_plan("alice", "a")
+    storage.add_saved_plans("alice", ["b", "c"], "March 03, 2025")
+    storage.save_user_profile("alice", {"age": 31})
+
+    assert [entry["id"] for entry in storage.get_saved_plans("alice")] == ["b", "c"]
+    assert storage.get_user_profile("alice") == {"age": 31}
+    assert storage.get_saved_plans("bob") == []
+    assert [entry["id"] for entry in backend.get_saved_plans("alice")] == ["a"]
+    storage.flush()
+
+
+def test_reads_overlay_the_batch_being_written(tmp_path):
+    backend = RecordingStorage(tmp_path)
+    storage = WriteBehindStorage(backend, flush_delay=60)
+    storage.add_saved_plan("alice", "a", "March 03, 2025")
+    storage.save_user_profile("alice", {"age": 30})
+
+    backend.release.clear()
+    flusher = threading.Thread(target=storage.flush)
+    flusher.start()
+    try:
+        assert backend.applying.wait(5)
+        # The batch has left the pending buffer but is not in the backend yet
+        assert [entry["id"] for entry in storage.get_saved_plans("alice")] == ["a"]
+        assert storage.get_user_profile("alice") == {"age": 30}
+        storage.add_saved_plan("alice", "b", "March 04, 2025")
+        assert [entry["id"] for entry in storage.get_saved_plans("alice")] == ["a", "b"]
+    finally:
+        backend.release.set()
+        flusher.join()
+
+    storage.flush()
+    assert [entry["id"] for entry in backend.get_saved_plans("alice")] == ["a", "b"]
+
+
+def test_failed_flush_is_retried_without_another_change(tmp_path):
+    backend = RecordingStorage(tmp_path, failures=1)
+    storage = WriteBehindStorage(backend, flush_delay=0.05)
+    storage.add_saved_plan("alice", "a", "March 03, 2025")
+    storage.save_user_profile("alice", {"age": 30})
+
+    wait_for(lambda: backend.batches)
+    assert backend.failures == 0
+    assert [entry["id"] for entry in backend.get_saved_plans("alice")] == ["a"]
+    assert backend.get_user_profile("alice") == {"age": 30}
+
+
+def test_failed_write_through_keeps_the_batch_for_the_next_change(tmp_path):
+    backend = RecordingStorage(tmp_path, failures=1)
+    storage = WriteBehindStorage(backend, flush_delay=0)
+    storage.add_saved_plan("alice", "a", "March 03, 2025")
+    assert backend.batches == []
+    assert [entry["id"] for entry in storage.get_saved_plans("alice")] == ["a"]
+
+    storage.add_saved_plan("alice", "b", "March 04, 2025")
+    assert len(backend.batches) == 1
+    assert [entry["id"] for entry in backend.get_saved_plans("alice")] == ["a", "b"]
+
+
+def test_sqlite_keeps_each_users_saved_plans_in_save_order(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "insurebot.db"))
+    storage.add_saved_plan("alice", "c", "March 01, 2025")
+    storage.add_saved_plan("bob", "a", "March 02, 2025")
+    storage.add_saved_plan("alice", "a", "March 03, 2025", snapshot={"id": "a", "title": "Plan A"})
+    storage.add_saved_plan("alice", "b", "March 04, 2025")
+
+    assert storage.get_saved_plans("alice") == [
+        {"id": "c", "date_saved": "March 01, 2025", "snapshot": None},
+        {"id": "a", "date_saved": "March 03, 2025", "snapshot": {"id": "a", "title": "Plan A"}},
+        {"id": "b", "date_saved": "March 04, 2025", "snapshot": None}
+    ]
+    assert [entry["id"] for entry in storage.get_saved_plans("bob")] == ["a"]
+    assert storage.get_saved_plans("carol") == []
+    assert {user_id: [entry["id"] for entry in entries]
+            for user_id, entries in storage.all_saved_plans().items()} == {"alice": ["c", "a", "b"], "bob": ["a"]}
+
+
+def test_sqlite_ignores_a_duplicate_save(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "insurebot.db"))
+    storage.add_saved_plan("alice", "a", "March 01, 2025")
+    storage.add_saved_plan("alice", "b", "March 02, 2025")
+    storage.add_saved_plan("alice", "a", "March 09, 2025", snapshot={"id": "a"})
+    storage.apply_changes({("alice", "b"): {"date_saved": "March 09, 2025", "snapshot": None}}, {})
+
+    assert storage.get_saved_plans("alice") == [
+        {"id": "a", "date_saved": "March 01, 2025", "snapshot": None},
+        {"id": "b", "date_saved": "March 02, 2025", "snapshot": None}
+    ]
+
+
+def test_sqlite_removes_only_that_users_plan(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "insurebot.db"))
+    storage.add_saved_plan("alice", "a", "March 01, 2025")
+    storage.add_saved_plan("alice", "b", "March 02, 2025")
+    storage.add_saved_plan("bob", "a", "March 03, 2025")
+
+    assert storage.remove_saved_plan("alice", "a")
+    assert storage.remove_saved_plan("alice", "missing")
+    storage.apply_changes({("bob", "a"): None, ("bob", "c"): {"date_saved": "March 04, 2025", "snapshot": None}}, {})
+
+    assert [entry["id"] for entry in storage.get_saved_plans("alice")] == ["b"]
+    assert [entry["id"] for entry in storage.get_saved_plans("bob")] == ["c"]
+
+
+def test_sqlite_profile_save_replaces_the_whole_profile(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "insurebot.db"))
+    assert storage.get_user_profile("alice") == {}
+    storage.save_user_profile("alice", {"age": 30, "smoker_status": "Smoker"})
+    storage.save_user_profile("bob", {"age": 40})
+    storage.save_user_profile("alice", {"age": 31})
+    storage.apply_changes({}, {"bob": {"age": 41}})
+
+    assert storage.get_user_profile("alice") == {"age": 31}
+    assert storage.all_user_profiles() == {"alice": {"age": 31}, "bob": {"age": 41}}
+
+
+def test_migration_copies_everything_and_can_run_twice(tmp_path):
+    source = JsonStorage(str(tmp_path / "saved_plans.json"), str(tmp_path / "user_profiles.json"))
+    source.add_saved_plan("alice", "b", "March 01, 2025")
+    source.add_saved_plan("alice", "a", "March 02, 2025", snapshot={"id": "a", "title": "Plan A"})
+    source.add_saved_plan("bob", "b", "March 03, 2025")
+    source.save_user_profile("alice", {"age": 30})
+    source.save_user_profile("bob", {"age": 40})
+    target = SqliteStorage(str(tmp_path / "insurebot.db"))
+
+    assert migrate_storage(source, target) == {"saved_plans": 3, "user_profiles": 2}
+    migrated = (target.all_saved_plans(), target.all_user_profiles())
+    assert migrated == (source.all_saved_plans(), source.all_user_profiles())
+
+    # A second run neither duplicates nor reorders anything
+    migrate_storage(source, target)
+    assert (target.all_saved_plans(), target.all_user_profiles()) == migrated